@@ -25,18 +25,67 @@ __license__ = "GNU General Public License Version 3"
 __version__ = "0.0.3"
 
 
-from idleopenline import utils
-from idleopenline.extension import idleopenline as idleopenline
+import importlib
+import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from idleopenline import utils as utils
+    from idleopenline.extension import idleopenline as idleopenline
+
+
+def __getattr__(name: str) -> object:
+    """Import extension on first use so importing this package is cheap.
+
+    Importing the extension pulls in tkinter and idlelib, which the
+    single instance launcher does not need.
+    """
+    value: object
+    if name == "utils":
+        value = importlib.import_module(f"{__name__}.utils")
+    elif name == "idleopenline":
+        value = importlib.import_module(f"{__name__}.extension").idleopenline
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 
 def check_installed() -> bool:
     """Make sure extension installed."""
+    from idleopenline import utils
+    from idleopenline.extension import idleopenline
+
+    # Make sure configuration exists so it can be found.
+    idleopenline.reload()
     return utils.check_installed(__title__, __version__, idleopenline)
 
 
-idleopenline.reload()
+def show_timings() -> bool:
+    """Print timings recorded by the last IDLE session. Return if any."""
+    from idleopenline.extension import idleopenline
+
+    try:
+        print(idleopenline.timings_file.read_text(encoding="utf-8"), end="")
+    except FileNotFoundError:
+        print(
+            "No timings recorded. Enable record_timings in the "
+            f"{__title__} extension options and restart IDLE.",
+        )
+        return False
+    return True
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Check installation, or show timings with `--timings`."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv == ["--timings"]:
+        show_timings()
+        return
+    check_installed()
 
 
 if __name__ == "__main__":
     print(f"{__title__} v{__version__}\nProgrammed by {__author__}.\n")
-    check_installed()
+    main()
@@ -24,16 +24,34 @@ __title__ = "extension"
 __author__ = "CoolCat467"
 __license__ = "GNU General Public License Version 3"
 
-import sys
+import atexit
+import os
+import re
+from functools import wraps
 from idlelib.config import idleConf
+from idlelib.filelist import FileList
 from pathlib import Path
+from tkinter import filedialog
 from typing import TYPE_CHECKING, ClassVar
 
-from idleopenline import utils
+from idleopenline import (
+    fileposition,
+    instance,
+    loader,
+    positions,
+    quickfix,
+    utils,
+)
 
 if TYPE_CHECKING:
     from collections.abc import Sequence
-    from idlelib.pyshell import PyShellEditorWindow
+    from idlelib.editor import EditorWindow
+    from idlelib.pyshell import PyShellEditorWindow, PyShellFileList
+    from tkinter import Event, Text, Tk
+
+
+# Position suffix, like `:32:4` in `file.py:32:4`
+POSITION_SUFFIX = re.compile(r"(?::-?[0-9]*)+")
 
 
 def debug(message: object) -> None:
@@ -43,7 +61,7 @@ def debug(message: object) -> None:
 
 
 def goto_line_col(
-    editwin: PyShellEditorWindow,
+    editwin: EditorWindow,
     line: int = 1,
     col: int = 0,
 ) -> None:
@@ -53,6 +71,81 @@ def goto_line_col(
     editwin.center()
 
 
+def goto_position(
+    editwin: EditorWindow,
+    position: fileposition.FilePosition,
+) -> None:
+    """Go to position in current file, selecting it if it is a range."""
+    goto_line_col(editwin, position.line, position.col)
+    if position.is_range():
+        utils.highlight_region(editwin.text, "sel", *position.as_select())
+
+
+def expect_large_file(position: fileposition.FilePosition) -> None:
+    """Load position's file viewport first if it is large enough."""
+    loader.expect(position, int(idleopenline.large_file_size))
+
+
+def open_position(
+    flist: PyShellFileList,
+    position: fileposition.FilePosition,
+) -> EditorWindow | None:
+    """Open position in a new editor window or focus already open one."""
+    expect_large_file(position)
+    editwin = flist.open(position.path)
+    # Window might have been open already.
+    loader.forget(position.path)
+    if editwin is None:
+        return None
+    goto_position(editwin, position)
+    return editwin
+
+
+def split_position(filename: str) -> fileposition.FilePosition | None:
+    """Return position if filename is a path with a position suffix.
+
+    Returns None if filename exists as is or has no position suffix.
+    """
+    if os.path.exists(filename):
+        return None
+    position = fileposition.FilePosition.parse(filename)
+    suffix = filename.removeprefix(position.path)
+    if suffix == filename or not POSITION_SUFFIX.fullmatch(suffix):
+        return None
+    return position
+
+
+def install_open_hook() -> None:
+    """Strip position suffixes before IDLE tries to load files.
+
+    Patches FileList.open so opening `file.py:32:4` loads `file.py`
+    once, then goes to the position once the new window is idle.
+    Does nothing if already installed.
+    """
+    original = FileList.open
+    if hasattr(original, "__wrapped__"):
+        return
+
+    @wraps(original)
+    def open_position_hook(
+        self: FileList,
+        filename: str,
+        action: bool | None = None,
+    ) -> EditorWindow | None:
+        """Open filename, handling position suffixes."""
+        position = None if action else split_position(filename)
+        if position is None:
+            return original(self, filename, action)
+        expect_large_file(position)
+        editwin = original(self, position.path)
+        loader.forget(position.path)
+        if editwin is not None:
+            editwin.text.after_idle(goto_position, editwin, position)
+        return editwin
+
+    FileList.open = open_position_hook  # type: ignore[method-assign]
+
+
 # Important weird: If event handler function returns 'break',
 # then it prevents other bindings of same event type from running.
 # If returns None, normal and others are also run.
@@ -65,7 +158,17 @@ class idleopenline(utils.BaseExtension):  # noqa: N801
     # Extend the file and format menus.
     menudefs: ClassVar[
         Sequence[tuple[str, Sequence[tuple[str, str] | None]]]
-    ] = []
+    ] = [
+        (
+            "edit",
+            [
+                None,
+                ("_Load Quickfix List...", "<<quickfix-load>>"),
+                ("Next Diagnostic", "<<quickfix-next>>"),
+                ("Previous Diagnostic", "<<quickfix-previous>>"),
+            ],
+        ),
+    ]
     # Default values for configuration file
     values: ClassVar = {
         "enable": "True",
@@ -73,22 +176,83 @@ class idleopenline(utils.BaseExtension):  # noqa: N801
         "enable_shell": "False",
         "save_last_position": "False",
         "max_entries": "21",
+        "save_delay": "1000",
+        "single_instance": "False",
+        "large_file_size": "0",
+        "log_max_size": "1048576",
+        "log_max_days": "30",
+        "log_archives": "5",
+        "record_timings": "False",
+        "profile": "False",
+        "profile_threshold": "500",
+        "profile_files": "20",
     }
     # Default key binds for configuration file
-    bind_defaults: ClassVar = {}
+    bind_defaults: ClassVar = {
+        "quickfix-load": None,
+        "quickfix-next": "<Alt-Key-period>",
+        "quickfix-previous": "<Alt-Key-comma>",
+    }
 
     save_last_position: str = "False"
     max_entries: int = 21
+    save_delay: int = 1000
+    single_instance: str = "False"
+    large_file_size: int = 0
+    log_max_size: int = 1048576
+    log_max_days: float = 30
+    log_archives: int = 5
+    record_timings: str = "False"
+    profile: str = "False"
+    profile_threshold: int = 500
+    profile_files: int = 20
 
     idlerc_folder = Path(idleConf.userdir).expanduser().absolute()
-    last_position_file = idlerc_folder / "last-positions.lst"
+    last_position_file = idlerc_folder / "last-positions.idx"
+    legacy_position_file = idlerc_folder / "last-positions.lst"
+    timings_file = utils.LOGS_PATH / "idleopenline-timings.json"
+    # Shared by all editor windows in this process
+    position_store: ClassVar[positions.PositionStore | None] = None
+    # Pending debounced flush callback id
+    flush_after_id: ClassVar[str | None] = None
+    # Receives positions from later launches in single instance mode
+    instance_server: ClassVar[instance.InstanceServer | None] = None
+    # Diagnostics being navigated, shared by all windows
+    quickfix_list: ClassVar[quickfix.QuickfixList | None] = None
+    # Pending background report ingestion callback id
+    ingest_after_id: ClassVar[str | None] = None
 
     def __init__(self, editwin: PyShellEditorWindow) -> None:
         """Initialize the settings for this extension."""
         super().__init__(editwin)
 
+        # Configuration is loaded by the first window, not at import.
+        if not self.config_loaded:
+            self.reload()
+        utils.set_log_rotation(
+            utils.LogRotation(
+                max_size=int(self.log_max_size),
+                max_age=float(self.log_max_days) * 24 * 60 * 60,
+                archives=int(self.log_archives),
+            ),
+        )
+        self.start_timings()
+        utils.profiler.enabled = self.profile == "True"
+        utils.profiler.threshold = int(self.profile_threshold) / 1000
+        utils.profiler.max_files = int(self.profile_files)
+        install_open_hook()
+        loader.install_loadfile_hook()
+        self.start_instance_server()
         self.reopen_file_position()
 
+    def start_timings(self) -> None:
+        """Start recording timings if enabled, written out at exit."""
+        if self.record_timings != "True" or utils.timings.enabled:
+            return
+        utils.timings.enabled = True
+        atexit.register(utils.timings.dump, self.timings_file)
+
+    @utils.timed
     def reopen_file_position(self) -> None:
         """Re-open IDLE correctly."""
         raw_filename: str | None = self.files.filename
@@ -96,76 +260,173 @@ class idleopenline(utils.BaseExtension):  # noqa: N801
         if raw_filename is None:
             return
 
-        position = utils.FilePosition.parse(raw_filename)
+        position = fileposition.FilePosition.parse(raw_filename)
 
         # Only continue if there are changes in path
         if position.path == raw_filename:
             if self.save_last_position != "True":
                 return
-            if not self.last_position_file.exists():
+            saved = self.get_position_store().get(
+                str(Path(raw_filename).absolute()),
+            )
+            if saved is None:
                 return
-            for line in self.last_position_file.read_text(
-                encoding="utf-8",
-            ).splitlines():
-                if raw_filename in line:
-                    position = utils.FilePosition.parse(line)
-                    break
+            position = saved
         else:
-            # Reload correct path
+            # Only happens if window was opened before the open hook was
+            # installed, reload correct path.
+            expect_large_file(position)
             self.editwin.io.loadfile(position.path)
+            loader.forget(position.path)
 
         # Go to correct location in file
-        goto_line_col(self.editwin, position.line, position.col)
-        # If is range, select range.
-        if position.is_range():
-            utils.highlight_region(self.text, "sel", *position.as_select())
+        goto_position(self.editwin, position)
+
+    def start_instance_server(self) -> None:
+        """Start single instance server if enabled and not running."""
+        cls = self.__class__
+        if self.single_instance != "True" or cls.instance_server is not None:
+            return
+        server = instance.InstanceServer(instance.get_socket_path())
+        if not server.start():
+            return
+        cls.instance_server = server
+        atexit.register(server.close)
+        cls.poll_instance_server(self.flist)
+
+    @classmethod
+    @utils.log_exceptions_catch
+    def poll_instance_server(cls, flist: PyShellFileList) -> None:
+        """Open positions sent by other launches, then check again later."""
+        server = cls.instance_server
+        if server is None:
+            return
+        flist.root.after(
+            instance.POLL_INTERVAL,
+            cls.poll_instance_server,
+            flist,
+        )
+        for position in server.get_positions():
+            open_position(flist, position)
+
+    @utils.log_exceptions_catch
+    def quickfix_load_event(self, event: Event[Text]) -> str:
+        """Ask for a report file and go to its first diagnostic."""
+        filename = filedialog.askopenfilename(
+            parent=self.text,
+            title="Load Quickfix List",
+        )
+        if not filename:
+            return "break"
+        quickfix_list = quickfix.QuickfixList.from_path(filename)
+        self.load_quickfix(quickfix_list)
+        return self.goto_diagnostic(quickfix_list.next())
 
+    def load_quickfix(self, quickfix_list: quickfix.QuickfixList) -> None:
+        """Navigate quickfix_list, reading the rest in the background."""
+        cls = self.__class__
+        if cls.ingest_after_id is not None:
+            self.editwin.root.after_cancel(cls.ingest_after_id)
+            cls.ingest_after_id = None
+        if cls.quickfix_list is not None:
+            cls.quickfix_list.close()
+        cls.quickfix_list = quickfix_list
+        cls.ingest_quickfix(self.editwin.root)
+
+    @classmethod
+    @utils.log_exceptions_catch
+    def ingest_quickfix(cls, root: Tk) -> None:
+        """Read next chunk of quickfix report, then schedule another."""
+        cls.ingest_after_id = None
+        quickfix_list = cls.quickfix_list
+        if quickfix_list is None:
+            return
+        quickfix_list.ingest()
+        if not quickfix_list.is_complete():
+            cls.ingest_after_id = root.after_idle(cls.ingest_quickfix, root)
+
+    def goto_diagnostic(self, diagnostic: quickfix.Diagnostic | None) -> str:
+        """Open diagnostic and show its message, or bell if None."""
+        quickfix_list = self.quickfix_list
+        if diagnostic is None or quickfix_list is None:
+            self.text.bell()
+            return "break"
+        editwin = open_position(self.flist, diagnostic.position)
+        if editwin is not None:
+            total = f"{len(quickfix_list)}"
+            if not quickfix_list.is_complete():
+                total += "+"
+            editwin.status_bar.set_label(
+                "quickfix",
+                f"{quickfix_list.current + 1}/{total}: {diagnostic.message}",
+            )
+        return "break"
+
+    @utils.log_exceptions_catch
+    def quickfix_next_event(self, event: Event[Text]) -> str:
+        """Go to next diagnostic in quickfix list."""
+        if self.quickfix_list is None:
+            return self.goto_diagnostic(None)
+        return self.goto_diagnostic(self.quickfix_list.next())
+
+    @utils.log_exceptions_catch
+    def quickfix_previous_event(self, event: Event[Text]) -> str:
+        """Go to previous diagnostic in quickfix list."""
+        if self.quickfix_list is None:
+            return self.goto_diagnostic(None)
+        return self.goto_diagnostic(self.quickfix_list.previous())
+
+    @classmethod
+    def get_position_store(cls) -> positions.PositionStore:
+        """Return shared last position store, reloaded if file changed."""
+        if cls.position_store is None:
+            cls.position_store = positions.PositionStore(
+                cls.last_position_file,
+                cls.legacy_position_file,
+            )
+            # Never lose positions that are still waiting to be written.
+            atexit.register(cls.flush_positions)
+        cls.position_store.refresh()
+        return cls.position_store
+
+    @utils.timed
     def save_current_position(self) -> None:
         """Save current position position."""
         self.reload()
 
-        position = utils.FilePosition.from_editor_current(self.editwin)
+        position = fileposition.FilePosition.from_editor_current(self.editwin)
 
         if position is None:
             return
-        if self.last_position_file.exists():
-            current_entries = self.last_position_file.read_text(
-                encoding="utf-8",
-            ).splitlines()
-        else:
-            current_entries = []
-
-        for idx, entry in reversed(tuple(enumerate(current_entries))):
-            if position.path in entry:
-                del current_entries[idx]
-                continue
-            if ":" not in entry:
-                del current_entries[idx]
-                continue
-            try:
-                if sys.platform == "win32":
-                    path = ":".join(entry.split(":", 2)[1:])
-                else:
-                    path = entry.split(":", 1)[0]
-            except Exception as exc:
-                utils.extension_log_exception(exc)
-                del current_entries[idx]
-                continue
-            try:
-                if not Path(path).exists():
-                    debug(f"{path = } not exists")
-                    del current_entries[idx]
-                    continue
-            except Exception as exc:
-                utils.extension_log_exception(exc)
-                del current_entries[idx]
-                continue
-
-        current_entries.insert(0, position.serialize())
-
-        current_entries = current_entries[: int(self.max_entries)]
-        with self.last_position_file.open("w", encoding="utf-8") as fp:
-            fp.write("\n".join(current_entries))
+
+        store = self.get_position_store()
+        store.max_entries = int(self.max_entries)
+        store.put(position)
+        self.schedule_flush()
+
+    def schedule_flush(self) -> None:
+        """Flush pending positions once no window has closed for save_delay.
+
+        Flushes immediately if save_delay is not positive.
+        """
+        cls = self.__class__
+        root = self.editwin.root
+        if cls.flush_after_id is not None:
+            root.after_cancel(cls.flush_after_id)
+            cls.flush_after_id = None
+        delay = int(self.save_delay)
+        if delay <= 0:
+            cls.flush_positions()
+            return
+        cls.flush_after_id = root.after(delay, cls.flush_positions)
+
+    @classmethod
+    @utils.log_exceptions_catch
+    def flush_positions(cls) -> None:
+        """Write pending positions to last position file."""
+        cls.flush_after_id = None
+        if cls.position_store is not None:
+            cls.position_store.flush()
 
     @utils.log_exceptions_catch
     def close(self) -> None:
@@ -0,0 +1,319 @@
+"""File Positions."""
+
+# Programmed by CoolCat467
+
+from __future__ import annotations
+
+# IDLE Open Line Extension
+# Copyright (C) 2025  CoolCat467
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__title__ = "fileposition"
+__author__ = "CoolCat467"
+__license__ = "GNU General Public License Version 3"
+
+# Kept free of tkinter and idlelib, the single instance launcher uses it.
+
+import sys
+from array import array
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+    from idlelib.pyshell import PyShellEditorWindow
+
+    from typing_extensions import Self
+
+# FilePositionArray column typecode, C int
+POSITION_TYPECODE = "i"
+# Positions parsed before adding them to the columns at once
+POSITION_BATCH = 4096
+
+
+def int_default(text: str, default: int = 0) -> int:
+    """Return text as int or default if there is a ValueError."""
+    try:
+        return int(text)
+    except ValueError:
+        return default
+
+
+def parse_position_fields(
+    file_position: str,
+) -> tuple[str, int, int, int, int]:
+    """Return path, line, col, line_end and col_end of file position string."""
+    line = 0
+    line_end = 0
+    col = 0
+    col_end = 0
+
+    windows_drive_letter = ""
+    if sys.platform == "win32":
+        windows_drive_letter, file_position = file_position.split(":", 1)
+        windows_drive_letter += ":"
+    position = file_position.rsplit(":", 5)
+
+    filename = position[0]
+    if len(position) > 1:
+        line = int_default(position[1])
+        line_end = line
+    if len(position) > 2:
+        col = int_default(position[2])
+        col_end = col
+    if len(position) > 4:
+        line_end = int_default(position[3], line_end)
+        col_end = int_default(position[4], col_end)
+
+    # If line end is before beginning, swap.
+    if line_end < line:
+        line, line_end = line_end, line
+        col, col_end = col_end, col
+
+    return f"{windows_drive_letter}{filename}", line, col, line_end, col_end
+
+
+class FilePosition(NamedTuple):
+    """File Position."""
+
+    path: str
+    line: int
+    col: int
+    line_end: int
+    col_end: int
+
+    def is_range(self) -> bool:
+        """Return True if file position covers a range."""
+        return self.line != self.line_end or self.col != self.col_end
+
+    def as_select(self) -> tuple[str, str]:
+        """Return text selection region index strings."""
+        return f"{self.line}.{self.col}", f"{self.line_end}.{self.col_end}"
+
+    def delta_column(self, delta: int = -1) -> Self:
+        """Return position but with delta added to column."""
+        return self._replace(col=self.col + delta)
+
+    @classmethod
+    def parse(cls, file_position: str) -> Self:
+        """Parse file position string."""
+        return cls(*parse_position_fields(file_position))
+
+    @staticmethod
+    def parse_many(
+        file_positions: Iterable[str],
+        store: FilePositionArray | None = None,
+    ) -> FilePositionArray:
+        """Parse file position strings into compact columnar storage.
+
+        Strings are consumed one at a time, so a report file can be
+        passed in directly. Line endings are stripped and empty lines are
+        skipped. Positions are added to store if given.
+        """
+        if store is None:
+            store = FilePositionArray()
+        store.extend_parse(file_positions)
+        return store
+
+    def serialize(self) -> str:
+        """Return file position as string."""
+        if self.is_range():
+            return f"{self.path}:{self.line}:{self.col}:{self.line_end}:{self.col_end}"
+        if self.col != 0:
+            return f"{self.path}:{self.line}:{self.col}"
+        return f"{self.path}:{self.line}"
+
+    @classmethod
+    def from_editor_current(cls, editwin: PyShellEditorWindow) -> Self | None:
+        """Return file position from editwin current position."""
+        current_filename = editwin.io.filename
+        if current_filename is None:
+            return None
+        # Imported here, utils pulls in tkinter
+        from idleopenline.utils import get_selected_text_indexes
+
+        current_filename = str(Path(current_filename).absolute())
+        selected = get_selected_text_indexes(editwin.text)
+        select_string = (":".join(selected)).replace(".", ":")
+        return cls.parse(f"{current_filename}:{select_string}")
+
+
+class FilePositionArray:
+    """File positions stored column-wise, with interned paths.
+
+    Numbers live in `array` columns and each path is stored once, so a
+    position takes a few bytes instead of a tuple and its objects.
+    Indexing and iterating return `FilePosition` views.
+    """
+
+    __slots__ = (
+        "col",
+        "col_end",
+        "line",
+        "line_end",
+        "path_ids",
+        "path_index",
+        "paths",
+    )
+
+    def __init__(self) -> None:
+        """Initialize empty store."""
+        self.paths: list[str] = []
+        # Path to index into paths
+        self.path_index: dict[str, int] = {}
+        self.path_ids = array(POSITION_TYPECODE)
+        self.line = array(POSITION_TYPECODE)
+        self.col = array(POSITION_TYPECODE)
+        self.line_end = array(POSITION_TYPECODE)
+        self.col_end = array(POSITION_TYPECODE)
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return (
+            f"<{self.__class__.__name__} positions={len(self)} "
+            f"paths={len(self.paths)}>"
+        )
+
+    def __len__(self) -> int:
+        """Return number of positions."""
+        return len(self.path_ids)
+
+    def __getitem__(self, index: int) -> FilePosition:
+        """Return position at index."""
+        return FilePosition(
+            self.paths[self.path_ids[index]],
+            self.line[index],
+            self.col[index],
+            self.line_end[index],
+            self.col_end[index],
+        )
+
+    def __iter__(self) -> Iterator[FilePosition]:
+        """Yield positions in order."""
+        paths = self.paths
+        for path_id, line, col, line_end, col_end in zip(
+            self.path_ids,
+            self.line,
+            self.col,
+            self.line_end,
+            self.col_end,
+            strict=True,
+        ):
+            yield FilePosition(paths[path_id], line, col, line_end, col_end)
+
+    def get_path_id(self, path: str) -> int:
+        """Return id of path, adding it if new."""
+        path_id = self.path_index.get(path)
+        if path_id is None:
+            path_id = len(self.paths)
+            self.path_index[path] = path_id
+            self.paths.append(path)
+        return path_id
+
+    def append_fields(
+        self,
+        path: str,
+        line: int,
+        col: int,
+        line_end: int,
+        col_end: int,
+    ) -> None:
+        """Add position from fields.
+
+        Numbers too big for the columns are clamped.
+        """
+        path_id = self.get_path_id(path)
+        columns = (self.line, self.col, self.line_end, self.col_end)
+        values = (line, col, line_end, col_end)
+        try:
+            for column, value in zip(columns, values, strict=True):
+                column.append(value)
+        except OverflowError:
+            size = len(self.path_ids)
+            limit = 2 ** (8 * self.line.itemsize - 1)
+            for column in columns:
+                del column[size:]
+            for column, value in zip(columns, values, strict=True):
+                column.append(max(-limit, min(value, limit - 1)))
+        self.path_ids.append(path_id)
+
+    def append(self, position: FilePosition) -> None:
+        """Add position."""
+        self.append_fields(*position)
+
+    def extend_parse(self, file_positions: Iterable[str]) -> int:
+        """Parse and add position strings. Return number added.
+
+        Line endings are stripped and empty lines are skipped.
+        """
+        count = len(self)
+        batch: list[tuple[str, int, int, int, int]] = []
+        for file_position in file_positions:
+            chars = file_position.rstrip("\r\n")
+            if not chars:
+                continue
+            batch.append(parse_position_fields(chars))
+            if len(batch) >= POSITION_BATCH:
+                self.extend_fields(batch)
+                batch.clear()
+        self.extend_fields(batch)
+        return len(self) - count
+
+    def extend_fields(
+        self,
+        batch: Sequence[tuple[str, int, int, int, int]],
+    ) -> None:
+        """Add positions from (path, line, col, line_end, col_end) tuples."""
+        if not batch:
+            return
+        paths, *numbers = zip(*batch, strict=True)
+        try:
+            new_columns = [
+                array(POSITION_TYPECODE, values) for values in numbers
+            ]
+        except OverflowError:
+            for fields in batch:
+                self.append_fields(*fields)
+            return
+        columns = (self.line, self.col, self.line_end, self.col_end)
+        for column, values in zip(columns, new_columns, strict=True):
+            column.extend(values)
+        self.path_ids.extend(
+            array(POSITION_TYPECODE, map(self.get_path_id, paths)),
+        )
+
+    def indexes_for(self, path: str) -> list[int]:
+        """Return indexes of positions in path."""
+        path_id = self.path_index.get(path)
+        if path_id is None:
+            return []
+        return [
+            index
+            for index, other_id in enumerate(self.path_ids)
+            if other_id == path_id
+        ]
+
+    def nbytes(self) -> int:
+        """Return bytes used by number columns."""
+        return sum(
+            len(column) * column.itemsize
+            for column in (
+                self.path_ids,
+                self.line,
+                self.col,
+                self.line_end,
+                self.col_end,
+            )
+        )
@@ -0,0 +1,243 @@
+"""Single Instance Mode."""
+
+# Programmed by CoolCat467
+
+from __future__ import annotations
+
+# IDLE Open Line Extension
+# Copyright (C) 2025  CoolCat467
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__title__ = "instance"
+__author__ = "CoolCat467"
+__license__ = "GNU General Public License Version 3"
+
+import os
+import queue
+import socket
+import sys
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from idleopenline import fileposition
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+# Milliseconds between checks for positions sent by other launches
+POLL_INTERVAL = 100
+# Seconds a client waits for a running instance to acknowledge
+CLIENT_TIMEOUT = 2.0
+# Maximum bytes accepted from one client
+MAX_MESSAGE = 1024 * 1024
+ACK = b"ok\n"
+# Start IDLE with the open hook installed before command line files open
+BOOTSTRAP = (
+    "from idleopenline.extension import install_open_hook; "
+    "install_open_hook(); "
+    "from idlelib.pyshell import main; "
+    "main()"
+)
+
+SUPPORTED = hasattr(socket, "AF_UNIX")
+
+
+def get_user_dir() -> Path:
+    """Return IDLE's user configuration folder, `~/.idlerc`.
+
+    Same rule as `idleConf.GetUserCfgDir`, without importing idlelib,
+    which pulls in tkinter.
+    """
+    home = os.path.expanduser("~")
+    if home == "~" or not os.path.exists(home):
+        home = os.getcwd()
+    return Path(home) / ".idlerc"
+
+
+def get_socket_path() -> Path:
+    """Return per-user socket path for this Python version."""
+    version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    folder = Path(runtime_dir) if runtime_dir else get_user_dir()
+    return folder / f"idleopenline-{version}.sock"
+
+
+def unix_socket() -> socket.socket:
+    """Return new Unix domain stream socket.
+
+    Raises OSError where Unix domain sockets are not supported.
+    """
+    # Platform check lets type checkers skip AF_UNIX on Windows.
+    if sys.platform != "win32" and SUPPORTED:
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    raise OSError("Unix domain sockets are not supported")
+
+
+def encode_positions(positions: Iterable[fileposition.FilePosition]) -> bytes:
+    """Return message sending positions, one serialized position per line."""
+    return "".join(
+        f"{position.serialize()}\n" for position in positions
+    ).encode("utf-8")
+
+
+def decode_positions(data: bytes) -> list[fileposition.FilePosition]:
+    """Return positions from message."""
+    return [
+        fileposition.FilePosition.parse(line)
+        for line in data.decode("utf-8").splitlines()
+        if line
+    ]
+
+
+def absolute_position(file_position: str) -> fileposition.FilePosition:
+    """Return parsed position with path made absolute.
+
+    Running instance does not share our working directory.
+    """
+    position = fileposition.FilePosition.parse(file_position)
+    return position._replace(path=str(Path(position.path).absolute()))
+
+
+def send_positions(
+    positions: Iterable[fileposition.FilePosition],
+    socket_path: Path,
+    timeout: float = CLIENT_TIMEOUT,
+) -> bool:
+    """Send positions to running instance. Return True if acknowledged."""
+    if not SUPPORTED:
+        return False
+    try:
+        with unix_socket() as client:
+            client.settimeout(timeout)
+            client.connect(str(socket_path))
+            client.sendall(encode_positions(positions))
+            client.shutdown(socket.SHUT_WR)
+            return client.recv(len(ACK)) == ACK
+    except OSError:
+        return False
+
+
+class InstanceServer:
+    """Receive positions sent by later launches over a Unix domain socket.
+
+    Connections are handled on a background thread. Received positions
+    are queued for the Tk thread to collect with `get_positions`.
+    """
+
+    __slots__ = ("listener", "positions", "socket_path", "thread")
+
+    def __init__(self, socket_path: Path) -> None:
+        """Initialize server for socket path."""
+        self.socket_path = socket_path
+        self.listener: socket.socket | None = None
+        self.thread: threading.Thread | None = None
+        self.positions: queue.SimpleQueue[fileposition.FilePosition] = (
+            queue.SimpleQueue()
+        )
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"{self.__class__.__name__}({self.socket_path!r})"
+
+    def start(self) -> bool:
+        """Start listening. Return False if another instance is listening."""
+        if not SUPPORTED:
+            return False
+        if send_positions((), self.socket_path):
+            return False
+        # Nobody answered, so any socket file left is stale.
+        self.socket_path.unlink(missing_ok=True)
+        try:
+            listener = unix_socket()
+        except OSError:
+            return False
+        try:
+            listener.bind(str(self.socket_path))
+            os.chmod(self.socket_path, 0o600)
+            listener.listen()
+        except OSError:
+            listener.close()
+            return False
+        self.listener = listener
+        self.thread = threading.Thread(
+            target=self.serve,
+            name=f"{__title__}-server",
+            daemon=True,
+        )
+        self.thread.start()
+        return True
+
+    def serve(self) -> None:
+        """Accept connections until closed."""
+        # Servers only run inside IDLE, the launcher never imports utils.
+        from idleopenline import utils
+
+        handle = utils.log_exceptions_catch(self.handle)
+        assert self.listener is not None
+        while True:
+            try:
+                connection, _address = self.listener.accept()
+            except OSError:
+                # Listener closed
+                return
+            with connection:
+                handle(connection)
+
+    def handle(self, connection: socket.socket) -> None:
+        """Read positions from client connection and acknowledge."""
+        connection.settimeout(CLIENT_TIMEOUT)
+        data = b""
+        while len(data) <= MAX_MESSAGE:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+        for position in decode_positions(data[:MAX_MESSAGE]):
+            self.positions.put(position)
+        connection.sendall(ACK)
+
+    def get_positions(self) -> list[fileposition.FilePosition]:
+        """Return positions received since last call."""
+        positions: list[fileposition.FilePosition] = []
+        while True:
+            try:
+                positions.append(self.positions.get_nowait())
+            except queue.Empty:
+                return positions
+
+    def close(self) -> None:
+        """Stop listening and remove socket file."""
+        if self.listener is None:
+            return
+        self.listener.close()
+        self.listener = None
+        self.socket_path.unlink(missing_ok=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Send file positions to running IDLE, or start IDLE with them."""
+    if argv is None:
+        argv = sys.argv[1:]
+    # Leave IDLE command line options to IDLE itself.
+    if argv and not any(arg.startswith("-") for arg in argv):
+        positions = [absolute_position(arg) for arg in argv]
+        if send_positions(positions, get_socket_path()):
+            return
+    # No running instance, become one.
+    os.execv(  # noqa: S606
+        sys.executable,
+        [sys.executable, "-c", BOOTSTRAP, *argv],
+    )
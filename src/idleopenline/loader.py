@@ -0,0 +1,307 @@
+"""Viewport First Loading of Large Files."""
+
+# Programmed by CoolCat467
+
+from __future__ import annotations
+
+# IDLE Open Line Extension
+# Copyright (C) 2025  CoolCat467
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__title__ = "loader"
+__author__ = "CoolCat467"
+__license__ = "GNU General Public License Version 3"
+
+import os
+import tokenize
+from functools import update_wrapper, wraps
+from idlelib.iomenu import IOBinding
+from tkinter import TclError
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from idlelib.editor import EditorWindow
+    from tkinter import Text
+
+    from idleopenline import fileposition
+
+# Lines inserted around the target line before anything else
+VIEW_LINES = 200
+# Lines inserted per after callback while streaming in the rest
+CHUNK_LINES = 2000
+# Milliseconds between chunks, lets Tk redraw and handle input
+CHUNK_DELAY = 1
+
+# Normalized path to position for files that should load viewport first
+pending: dict[str, fileposition.FilePosition] = {}
+# IOBinding to loader still streaming in its file
+active: dict[IOBinding, ProgressiveLoader] = {}
+
+
+def get_key(filename: str) -> str:
+    """Return pending load key for filename."""
+    return os.path.normcase(os.path.abspath(filename))
+
+
+def expect(position: fileposition.FilePosition, min_size: int) -> bool:
+    """Load position's file viewport first if it is at least min_size bytes.
+
+    Applies to the next `IOBinding.loadfile` of that file. Return True if
+    registered. Does nothing if min_size is not positive.
+    """
+    if min_size <= 0:
+        return False
+    try:
+        size = os.path.getsize(position.path)
+    except OSError:
+        return False
+    if size < min_size:
+        return False
+    pending[get_key(position.path)] = position
+    return True
+
+
+def split_lines(chars: str) -> list[str]:
+    """Return lines of chars, keeping newlines.
+
+    Unlike str.splitlines, only splits on newline characters, just like
+    Tk text line numbers.
+    """
+    lines = chars.split("\n")
+    last = lines.pop()
+    result = [f"{line}\n" for line in lines]
+    if last:
+        result.append(last)
+    return result
+
+
+def forget(filename: str) -> None:
+    """Forget expected load of filename, if any."""
+    pending.pop(get_key(filename), None)
+
+
+class ProgressiveLoader:
+    """Insert lines around a target first, then stream in the rest.
+
+    Lines above the view start out as empty placeholder lines, so line
+    numbers are correct from the start. The text widget is read only
+    until every line is in.
+
+    Chunks are written below the undo delegator, so loading neither
+    fills the undo history nor marks the window as modified.
+    """
+
+    __slots__ = (
+        "after_id",
+        "editwin",
+        "lines",
+        "next_line",
+        "suffix_line",
+        "view_start",
+    )
+
+    def __init__(
+        self,
+        editwin: EditorWindow,
+        lines: list[str],
+        target_line: int,
+    ) -> None:
+        """Initialize loader for lines, showing target_line first."""
+        self.editwin = editwin
+        self.lines = lines
+        total = len(lines)
+        # Lines are 1 based, like Tk text indexes.
+        self.view_start = max(
+            min(target_line - VIEW_LINES // 2, total - VIEW_LINES + 1),
+            1,
+        )
+        # Next placeholder line to fill in
+        self.next_line = 1
+        # Lines from suffix_line on are not inserted yet
+        self.suffix_line = min(self.view_start + VIEW_LINES, total + 1)
+        self.after_id: str | None = None
+
+        view = "".join(lines[self.view_start - 1 : self.suffix_line - 1])
+        # Placeholders keep line numbers right while the top streams in.
+        editwin.text.insert("1.0", "\n" * (self.view_start - 1) + view)
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"{self.__class__.__name__}({self.editwin!r})"
+
+    def start(self) -> None:
+        """Make text read only and schedule streaming in the rest."""
+        active[self.editwin.io] = self
+        self.editwin.text.configure(state="disabled")
+        self.schedule()
+
+    def schedule(self) -> None:
+        """Schedule next chunk."""
+        self.after_id = self.editwin.text.after(CHUNK_DELAY, self.load_chunk)
+
+    def is_done(self) -> bool:
+        """Return True if every line has been inserted."""
+        total = len(self.lines)
+        return self.next_line >= self.view_start and self.suffix_line > total
+
+    def insert_chunk(self) -> None:
+        """Insert the next chunk of lines."""
+        text = self.editwin.text
+        # Below undo, but above the colorizer and other filters
+        below_undo: Text = self.editwin.undo.delegate  # type: ignore[assignment]
+        if self.next_line < self.view_start:
+            # Replace placeholder lines above the view, keeping the same
+            # line at the top of the view.
+            top = text.index("@0,0")
+            end = min(self.next_line + CHUNK_LINES, self.view_start)
+            below_undo.delete(f"{self.next_line}.0", f"{end}.0")
+            below_undo.insert(
+                f"{self.next_line}.0",
+                "".join(self.lines[self.next_line - 1 : end - 1]),
+            )
+            text.yview(top)
+            self.next_line = end
+            return
+        end = min(self.suffix_line + CHUNK_LINES, len(self.lines) + 1)
+        below_undo.insert(
+            "end-1c",
+            "".join(self.lines[self.suffix_line - 1 : end - 1]),
+        )
+        self.suffix_line = end
+
+    def load_chunk(self) -> None:
+        """Insert next chunk, then schedule another or finish."""
+        self.after_id = None
+        text = self.editwin.text
+        try:
+            text.configure(state="normal")
+            self.insert_chunk()
+            if self.is_done():
+                self.finish()
+                return
+            text.configure(state="disabled")
+        except TclError:
+            # Window closed while loading
+            active.pop(self.editwin.io, None)
+            return
+        self.schedule()
+
+    def complete(self) -> None:
+        """Insert every remaining line now and finish."""
+        text = self.editwin.text
+        if self.after_id is not None:
+            text.after_cancel(self.after_id)
+            self.after_id = None
+        text.configure(state="normal")
+        while not self.is_done():
+            self.insert_chunk()
+        self.finish()
+
+    def finish(self) -> None:
+        """Make text editable with a clean undo history."""
+        active.pop(self.editwin.io, None)
+        self.editwin.text.configure(state="normal")
+        self.editwin.io.reset_undo()
+        self.editwin.io.set_saved(True)
+
+
+def complete_loading(io: IOBinding) -> None:
+    """Finish loading io's file right away if it is still streaming in."""
+    progressive = active.get(io)
+    if progressive is not None:
+        progressive.complete()
+
+
+def load_viewport_first(
+    io: IOBinding,
+    filename: str,
+    position: fileposition.FilePosition,
+) -> bool:
+    """Load filename showing position first. Return False if unable to.
+
+    Files that need encoding or newline questions answered are left to
+    IDLE's regular loadfile.
+    """
+    try:
+        with tokenize.open(filename) as fp:
+            chars = fp.read()
+            fileencoding = fp.encoding
+            eol_convention = fp.newlines
+    except (OSError, UnicodeDecodeError, SyntaxError):
+        return False
+    if isinstance(eol_convention, tuple):
+        # Mixed newlines, IDLE warns about these
+        return False
+
+    io.text.delete("1.0", "end")
+    io.set_filename(None)
+    io.fileencoding = fileencoding
+    io.eol_convention = eol_convention or os.linesep
+    loader = ProgressiveLoader(
+        io.editwin,
+        split_lines(chars),
+        position.line,
+    )
+    io.reset_undo()
+    io.set_filename(filename)
+    io.text.mark_set("insert", "1.0")
+    io.updaterecentfileslist(filename)
+    loader.start()
+    return True
+
+
+def install_complete_hook(name: str) -> None:
+    """Patch IOBinding method name to finish loading before it runs.
+
+    Keeps saving, or closing and answering the save prompt, from
+    writing a partially loaded file.
+    """
+    original = getattr(IOBinding, name)
+    if hasattr(original, "__wrapped__"):
+        return
+
+    def complete_hook(self: IOBinding, *args: object) -> object:
+        """Finish loading, then run original."""
+        complete_loading(self)
+        return original(self, *args)
+
+    setattr(IOBinding, name, update_wrapper(complete_hook, original))
+
+
+def install_loadfile_hook() -> None:
+    """Patch IOBinding.loadfile to load expected files viewport first.
+
+    Also patches saving to finish loading first. Does nothing if
+    already installed.
+    """
+    for name in ("maybesave", "save", "save_as", "save_a_copy"):
+        install_complete_hook(name)
+    original = IOBinding.loadfile
+    if hasattr(original, "__wrapped__"):
+        return
+
+    @wraps(original)
+    def loadfile_hook(self: IOBinding, filename: str) -> bool:
+        """Load file, viewport first if expected."""
+        position = pending.pop(get_key(filename), None)
+        if position is not None and load_viewport_first(
+            self,
+            filename,
+            position,
+        ):
+            return True
+        return original(self, filename)
+
+    IOBinding.loadfile = loadfile_hook  # type: ignore[method-assign]
@@ -0,0 +1,621 @@
+"""Last Position Storage."""
+
+# Programmed by CoolCat467
+
+from __future__ import annotations
+
+# IDLE Open Line Extension
+# Copyright (C) 2025  CoolCat467
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__title__ = "positions"
+__author__ = "CoolCat467"
+__license__ = "GNU General Public License Version 3"
+
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from idleopenline import fileposition, utils
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+
+# Index file records are tab separated so paths containing colons
+# (Windows drive letters, URLs, etc) are never ambiguous.
+RECORD_SEPARATOR = "\t"
+HEADER = "# idleopenline last positions v1"
+# Index file size in bytes after which the journal is compacted
+COMPACT_SIZE = 64 * 1024
+# Seconds to wait for other processes writing the index file
+LOCK_TIMEOUT = 1.0
+
+
+def serialize_record(position: fileposition.FilePosition) -> str:
+    """Return file position as index file record."""
+    return RECORD_SEPARATOR.join(
+        (
+            position.path,
+            str(position.line),
+            str(position.col),
+            str(position.line_end),
+            str(position.col_end),
+        ),
+    )
+
+
+def parse_record(record: str) -> fileposition.FilePosition | None:
+    """Return file position from index file record or None if malformed."""
+    fields = record.rsplit(RECORD_SEPARATOR, 4)
+    if len(fields) != 5 or not fields[0]:
+        return None
+    path, line, col, line_end, col_end = fields
+    try:
+        return fileposition.FilePosition(
+            path=path,
+            line=int(line),
+            col=int(col),
+            line_end=int(line_end),
+            col_end=int(col_end),
+        )
+    except ValueError:
+        return None
+
+
+def read_records(lines: Iterable[str]) -> dict[str, fileposition.FilePosition]:
+    """Return mapping of path to position from index file lines.
+
+    Later records for the same path replace earlier ones.
+    """
+    entries: dict[str, fileposition.FilePosition] = {}
+    for line in lines:
+        if not line or line.startswith("#"):
+            continue
+        position = parse_record(line)
+        if position is None:
+            continue
+        # Re-insert so dictionary order matches record order.
+        entries.pop(position.path, None)
+        entries[position.path] = position
+    return entries
+
+
+def read_legacy(lines: Iterable[str]) -> dict[str, fileposition.FilePosition]:
+    """Return mapping of path to position from legacy `.lst` file lines.
+
+    Legacy files are stored most recent first.
+    """
+    entries: dict[str, fileposition.FilePosition] = {}
+    for line in reversed(tuple(lines)):
+        if ":" not in line:
+            continue
+        try:
+            position = fileposition.FilePosition.parse(line)
+        except ValueError:
+            continue
+        entries.pop(position.path, None)
+        entries[position.path] = position
+    return entries
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write data to path so readers never see a partially written file."""
+    temp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with temp.open("wb") as fp:
+            fp.write(data)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp, path)
+    finally:
+        temp.unlink(missing_ok=True)
+
+
+class ExistenceChecker:
+    """Check if paths exist on a bounded pool of background threads.
+
+    Results are cached for `ttl` seconds. Workers are daemon threads, so
+    a check stuck on an unreachable network mount never blocks exit.
+    """
+
+    __slots__ = (
+        "lock",
+        "max_workers",
+        "queue",
+        "queued",
+        "results",
+        "started",
+        "timeout",
+        "ttl",
+        "workers",
+    )
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        timeout: float = 2.0,
+        ttl: float = 300.0,
+    ) -> None:
+        """Initialize checker.
+
+        Arguments:
+        ---------
+            max_workers: Maximum number of worker threads.
+            timeout: Seconds to wait for each path's check, see `check_many`.
+            ttl: Seconds a result is cached for.
+
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.queue: queue.SimpleQueue[str] = queue.SimpleQueue()
+        # Path to event set once its check finishes
+        self.queued: dict[str, threading.Event] = {}
+        # Path to (monotonic time checked, exists)
+        self.results: dict[str, tuple[float, bool]] = {}
+        # Path to monotonic time a worker started checking it
+        self.started: dict[str, float] = {}
+        self.workers: list[threading.Thread] = []
+
+    def cached(self, path: str) -> bool | None:
+        """Return cached result for path or None if unknown or expired."""
+        with self.lock:
+            result = self.results.get(path)
+        if result is None:
+            return None
+        checked, exists = result
+        if time.monotonic() - checked > self.ttl:
+            return None
+        return exists
+
+    def submit(self, path: str) -> threading.Event:
+        """Queue check for path if not queued already.
+
+        Return event that is set once the check finishes.
+        """
+        with self.lock:
+            event = self.queued.get(path)
+            if event is not None:
+                return event
+            event = threading.Event()
+            self.queued[path] = event
+            self.queue.put(path)
+            if len(self.workers) < self.max_workers:
+                worker = threading.Thread(
+                    target=self.work,
+                    name=f"{__title__}-exists-{len(self.workers)}",
+                    daemon=True,
+                )
+                self.workers.append(worker)
+                worker.start()
+        return event
+
+    def work(self) -> None:
+        """Check queued paths forever."""
+        while True:
+            path = self.queue.get()
+            with self.lock:
+                self.started[path] = time.monotonic()
+            try:
+                exists = Path(path).exists()
+            except Exception as exc:
+                utils.extension_log_exception(exc)
+                exists = False
+            with self.lock:
+                self.results[path] = (time.monotonic(), exists)
+                del self.started[path]
+                event = self.queued.pop(path)
+            event.set()
+
+    def wait(self, path: str, event: threading.Event) -> bool | None:
+        """Wait for check of path to finish and return if path exists.
+
+        Return None if the check ran for `timeout` seconds, or was not
+        started by a worker within `timeout` seconds.
+        """
+        with self.lock:
+            started = self.started.get(path)
+        # A queued check gets timeout seconds to start, then to finish.
+        begin = time.monotonic() if started is None else started
+        deadline = begin + self.timeout
+        while not event.wait(max(deadline - time.monotonic(), 0)):
+            with self.lock:
+                started = self.started.get(path)
+            if event.is_set():
+                break
+            if started is None or started + self.timeout <= deadline:
+                return None
+            deadline = started + self.timeout
+        with self.lock:
+            return self.results[path][1]
+
+    def check_many(self, paths: Iterable[str]) -> dict[str, bool | None]:
+        """Return if each path exists.
+
+        Each check gets its own `timeout` seconds from when a worker
+        starts it, so one slow path does not use up the time of the
+        paths after it. Result is None for paths whose check timed out.
+        """
+        results: dict[str, bool | None] = {}
+        waiting: dict[str, threading.Event] = {}
+        for path in paths:
+            exists = self.cached(path)
+            if exists is None:
+                waiting[path] = self.submit(path)
+            else:
+                results[path] = exists
+        for path, event in waiting.items():
+            results[path] = self.wait(path, event)
+        return results
+
+
+class CacheInfo(NamedTuple):
+    """Position store cache statistics."""
+
+    hits: int
+    misses: int
+    entries: int
+
+
+class PositionStore:
+    """Keyed storage of last file positions.
+
+    Positions are looked up by exact path. Entries are kept in least
+    to most recently saved order, both in memory and in the index file.
+
+    The index file is an append only journal. Each header line starts a
+    new generation of the file, and records after it are replayed in
+    order so the last record for a path wins. Once the journal grows past
+    `compact_size` bytes it is compacted in a background thread, dropping
+    entries for files that no longer exist and keeping the latest
+    `max_entries` records.
+
+    Parsed entries are cached, use `refresh` to only replay the index
+    file when its modification time or size changes.
+
+    Positions added with `put` are pending until `flush` or `save` writes
+    them, and survive reloads in the meantime.
+
+    Several processes can share one index file. Writes happen while
+    holding an operating system lock (`fcntl.flock`, or `msvcrt.locking`
+    on Windows) on `lock_path`, waiting at most `lock_timeout` seconds
+    for it. The lock is released when its holder exits or dies, so it is
+    never broken as stale. Rewrites first merge records other processes
+    wrote since the last read.
+    """
+
+    __slots__ = (
+        "checker",
+        "compact_size",
+        "compactor",
+        "entries",
+        "generation",
+        "hits",
+        "index_seen",
+        "legacy_path",
+        "loaded",
+        "lock",
+        "lock_path",
+        "lock_timeout",
+        "max_entries",
+        "misses",
+        "offset",
+        "path",
+        "pending",
+        "signature",
+    )
+
+    def __init__(self, path: Path, legacy_path: Path | None = None) -> None:
+        """Initialize store for index file path.
+
+        If index file does not exist yet and legacy_path does,
+        legacy entries are migrated on load.
+        """
+        self.path = path
+        self.legacy_path = legacy_path
+        self.entries: dict[str, fileposition.FilePosition] = {}
+        self.pending: dict[str, fileposition.FilePosition] = {}
+        self.max_entries: int | None = None
+        self.compact_size = COMPACT_SIZE
+        self.loaded = False
+        # Legacy entries are only migrated if no index file was ever seen
+        self.index_seen = False
+        self.signature: tuple[int, int] | None = None
+        # Header line of the index file generation entries came from
+        self.generation: bytes | None = None
+        # Bytes of index file replayed so far
+        self.offset = 0
+        self.hits = 0
+        self.misses = 0
+        # Serializes writes to the index file within this process
+        self.lock = threading.Lock()
+        # Operating system lock on this file serializes writes to the
+        # index file between processes, see `utils.try_lock_file`
+        self.lock_path = path.with_name(f"{path.name}.lock")
+        self.lock_timeout = LOCK_TIMEOUT
+        self.compactor: threading.Thread | None = None
+        self.checker = ExistenceChecker()
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"{self.__class__.__name__}({self.path!r})"
+
+    def __len__(self) -> int:
+        """Return number of stored positions."""
+        return len(self.entries)
+
+    def get_signature(self) -> tuple[int, int] | None:
+        """Return index file (modification time, size) or None if missing."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def cache_info(self) -> CacheInfo:
+        """Return cache hit and miss statistics."""
+        return CacheInfo(self.hits, self.misses, len(self.entries))
+
+    def refresh(self) -> bool:
+        """Reload entries if index file changed. Return True if reloaded.
+
+        If records were only appended since last time, only the new
+        records are replayed.
+        """
+        signature = self.get_signature()
+        if self.loaded and signature == self.signature:
+            self.hits += 1
+            return False
+        self.misses += 1
+        if not self.loaded or signature is None or self.generation is None:
+            self.load()
+            return True
+        # Stat before reading so a concurrent write is seen next refresh.
+        self.signature = signature
+        if not self.replay():
+            self.load()
+            return True
+        self.apply_pending()
+        return True
+
+    def replay(self) -> bool:
+        """Replay index file records not replayed yet.
+
+        Return False if index file was replaced by a new generation.
+        """
+        with self.path.open("rb") as fp:
+            header = fp.readline()
+            if self.generation is not None and header != self.generation:
+                return False
+            self.generation = header
+            self.offset = max(self.offset, len(header))
+            fp.seek(self.offset)
+            data = fp.read()
+        # Ignore incomplete record that is still being appended.
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+        records = read_records(data[:end].decode("utf-8").splitlines())
+        for path, position in records.items():
+            self.entries.pop(path, None)
+            self.entries[path] = position
+        return True
+
+    def merge(self) -> None:
+        """Merge records other processes wrote since the last read.
+
+        Pending positions stay the most recent entries.
+        """
+        signature = self.get_signature()
+        if signature is None or signature == self.signature:
+            return
+        self.signature = signature
+        try:
+            if self.generation is None or not self.replay():
+                # Not read yet or rewritten by another process.
+                self.entries = {}
+                self.generation = None
+                self.offset = 0
+                self.replay()
+        except FileNotFoundError:
+            return
+        self.apply_pending()
+
+    @contextmanager
+    def write_lock(self) -> Generator[bool, None, None]:
+        """Hold index file locks for this thread and other processes.
+
+        Yields True if the process lock was taken within `lock_timeout`.
+        """
+        with (
+            self.lock,
+            utils.lock_file(self.lock_path, self.lock_timeout) as locked,
+        ):
+            yield locked
+
+    def apply_pending(self) -> None:
+        """Re-apply positions that are not written yet."""
+        # Positions not written yet are newer than anything on disk.
+        for position in self.pending.values():
+            self.entries.pop(position.path, None)
+            self.entries[position.path] = position
+
+    def load(self) -> None:
+        """Load entries from index file, migrating legacy file if needed."""
+        self.loaded = True
+        self.entries = {}
+        self.generation = None
+        self.offset = 0
+        # Stat before reading so a concurrent write is seen next refresh.
+        self.signature = self.get_signature()
+        migrate = False
+        if self.signature is not None:
+            self.index_seen = True
+            self.replay()
+        elif (
+            not self.index_seen
+            and self.legacy_path is not None
+            and self.legacy_path.exists()
+        ):
+            self.entries = read_legacy(
+                self.legacy_path.read_text(encoding="utf-8").splitlines(),
+            )
+            migrate = True
+        self.apply_pending()
+        if migrate:
+            # Legacy file is left alone so older versions keep working.
+            self.save()
+
+    def save(self) -> None:
+        """Atomically rewrite index file as a new generation.
+
+        Records other processes wrote since the last read are kept.
+        """
+        # Written anyway if the lock times out, losing a concurrent
+        # write beats losing ours.
+        with self.write_lock():
+            self.write_generation()
+
+    def write_generation(self) -> None:
+        """Rewrite index file as a new generation, holding `write_lock`."""
+        self.merge()
+        if self.max_entries is not None:
+            self.prune(self.max_entries)
+        generation = f"{HEADER} {uuid.uuid4().hex}\n".encode()
+        data = generation + "".join(
+            f"{serialize_record(position)}\n"
+            for position in self.entries.values()
+        ).encode("utf-8")
+        atomic_write_bytes(self.path, data)
+        self.pending.clear()
+        self.index_seen = True
+        self.generation = generation
+        self.offset = len(data)
+        # Our own write should not invalidate the cache.
+        self.signature = self.get_signature()
+
+    def flush(self) -> bool:
+        """Append pending positions to index file. Return True if written."""
+        if not self.pending:
+            return False
+        if self.generation is None:
+            # No journal to append to yet
+            self.save()
+            return True
+        data = "".join(
+            f"{serialize_record(position)}\n"
+            for position in self.pending.values()
+        ).encode("utf-8")
+        # Appending is safe enough even if the lock times out.
+        with self.write_lock():
+            before = self.get_signature()
+            if before is None or before[1] == 0:
+                # Index file vanished, appending would leave no header.
+                self.write_generation()
+                return True
+            with self.path.open("a+b") as fp:
+                size = fp.seek(0, os.SEEK_END)
+                if size:
+                    fp.seek(size - 1)
+                    if fp.read(1) != b"\n":
+                        # Start a new line after a record torn by a crash.
+                        data = b"\n" + data
+                fp.write(data)
+            self.pending.clear()
+            if before == self.signature and size == self.offset:
+                # Nobody else wrote since our last read, so the cache
+                # still matches the file.
+                self.offset += len(data)
+                self.signature = self.get_signature()
+        if size + len(data) > self.compact_size:
+            self.start_compaction()
+        return True
+
+    def start_compaction(self) -> None:
+        """Compact index file in a background thread if not already running."""
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+        self.compactor = threading.Thread(
+            target=self.compact,
+            name=f"{__title__}-compact",
+        )
+        self.compactor.start()
+
+    @utils.log_exceptions_catch
+    def compact(self) -> None:
+        """Rewrite index file without missing files and extra records.
+
+        Does not modify in memory entries, the next `refresh` reloads
+        the compacted file. Skipped if another process holds the write
+        lock or rewrites the file meanwhile.
+        """
+        journal = PositionStore(self.path)
+        journal.load()
+        loaded_generation = journal.generation
+        # Existence checks can be slow, keep them out of the lock.
+        journal.remove_missing(self.checker)
+        with self.write_lock() as locked:
+            if not locked:
+                return
+            journal.merge()
+            if journal.generation != loaded_generation:
+                return
+            if self.max_entries is not None:
+                journal.prune(self.max_entries)
+            generation = f"{HEADER} {uuid.uuid4().hex}\n"
+            data = generation + "".join(
+                f"{serialize_record(position)}\n"
+                for position in journal.entries.values()
+            )
+            atomic_write_bytes(self.path, data.encode("utf-8"))
+
+    def get(self, path: str) -> fileposition.FilePosition | None:
+        """Return saved position for exact path or None if not saved."""
+        return self.entries.get(path)
+
+    def put(self, position: fileposition.FilePosition) -> None:
+        """Save position as most recent entry for its path.
+
+        Position is pending until next `flush` or `save`.
+        """
+        self.entries.pop(position.path, None)
+        self.entries[position.path] = position
+        self.pending.pop(position.path, None)
+        self.pending[position.path] = position
+
+    def remove_missing(self, checker: ExistenceChecker) -> list[str]:
+        """Remove entries whose file no longer exists. Return removed paths.
+
+        Entries whose check does not finish in time are kept.
+        """
+        removed = [
+            path
+            for path, exists in checker.check_many(self.entries).items()
+            if exists is False
+        ]
+        for path in removed:
+            del self.entries[path]
+        return removed
+
+    def prune(self, max_entries: int) -> None:
+        """Only keep max_entries most recent entries."""
+        excess = len(self.entries) - max(max_entries, 0)
+        for path in tuple(self.entries)[: max(excess, 0)]:
+            del self.entries[path]
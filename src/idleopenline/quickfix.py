@@ -0,0 +1,183 @@
+"""Quickfix List of Linter and Type Checker Diagnostics."""
+
+# Programmed by CoolCat467
+
+from __future__ import annotations
+
+# IDLE Open Line Extension
+# Copyright (C) 2025  CoolCat467
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__title__ = "quickfix"
+__author__ = "CoolCat467"
+__license__ = "GNU General Public License Version 3"
+
+import os
+import re
+from typing import TYPE_CHECKING, NamedTuple
+
+from idleopenline import fileposition
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+    from typing_extensions import Self
+
+# Lines read per ingest call
+CHUNK_LINES = 1000
+
+# Same grammar as `report_re` in tools/mypy_annotate.py, but any message
+# is accepted so Ruff output works as well as mypy output.
+# Example: 'package/filename.py:42:1:46:3: error: Type error here [code]'
+REPORT = re.compile(
+    r"""
+    ((?:[A-Za-z]:)?[^:]+):  # Filename, maybe with a Windows drive letter
+    ([0-9]+):  # Line number (start)
+    (?:([0-9]+):  # Optional column number
+      (?:([0-9]+):([0-9]+):)?  # then optionally end line and end column
+    )?
+    \s*(.*)  # Message
+    """,
+    re.VERBOSE,
+)
+
+
+class Diagnostic(NamedTuple):
+    """Report message at a file position."""
+
+    position: fileposition.FilePosition
+    message: str
+
+
+def parse_diagnostic(line: str, base: str = "") -> Diagnostic | None:
+    """Return diagnostic from report line or None if not a diagnostic.
+
+    Relative paths are taken relative to base directory.
+    """
+    match = REPORT.fullmatch(line.rstrip())
+    if match is None:
+        return None
+    filename, line_start, col, line_end, col_end, message = match.groups()
+    start = int(line_start)
+    col_start = int(col) if col is not None else 0
+    position = fileposition.FilePosition(
+        path=os.path.normpath(os.path.join(base, filename)),
+        line=start,
+        col=col_start,
+        line_end=int(line_end) if line_end is not None else start,
+        col_end=int(col_end) if col_end is not None else col_start,
+    )
+    return Diagnostic(position, message)
+
+
+class QuickfixList:
+    """Diagnostics read incrementally from a report stream.
+
+    Diagnostics are kept in report order, and indexed by file. Only as
+    much of the stream is read as navigation or `ingest` calls need.
+    """
+
+    __slots__ = ("base", "by_file", "current", "items", "stream")
+
+    def __init__(self, stream: TextIO | None, base: str | None = None) -> None:
+        """Initialize list reading stream, relative paths from base."""
+        self.stream = stream
+        self.base = os.getcwd() if base is None else base
+        self.items: list[Diagnostic] = []
+        # Path to indexes into items, in first seen order
+        self.by_file: dict[str, list[int]] = {}
+        # Index of current item, -1 before the first
+        self.current = -1
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"{self.__class__.__name__}({self.stream!r}, {self.base!r})"
+
+    def __len__(self) -> int:
+        """Return number of diagnostics read so far."""
+        return len(self.items)
+
+    @classmethod
+    def from_path(cls, path: str, base: str | None = None) -> Self:
+        """Return list reading report file.
+
+        Relative paths are taken relative to base directory, the current
+        working directory by default, as linters report them relative to
+        where they ran.
+        """
+        # Closed once the whole report is read, or by close
+        stream = open(  # noqa: SIM115
+            path,
+            encoding="utf-8",
+            errors="replace",
+        )
+        return cls(stream, base)
+
+    def is_complete(self) -> bool:
+        """Return True if the whole report has been read."""
+        return self.stream is None
+
+    def add(self, diagnostic: Diagnostic) -> None:
+        """Add diagnostic to the end of the list."""
+        self.by_file.setdefault(diagnostic.position.path, []).append(
+            len(self.items),
+        )
+        self.items.append(diagnostic)
+
+    def ingest(self, max_lines: int = CHUNK_LINES) -> int:
+        """Read up to max_lines report lines. Return diagnostics added."""
+        if self.stream is None:
+            return 0
+        count = len(self.items)
+        for _ in range(max_lines):
+            line = self.stream.readline()
+            if not line:
+                self.close()
+                break
+            diagnostic = parse_diagnostic(line, self.base)
+            if diagnostic is not None:
+                self.add(diagnostic)
+        return len(self.items) - count
+
+    def files(self) -> list[str]:
+        """Return paths with diagnostics, in first seen order."""
+        return list(self.by_file)
+
+    def for_file(self, path: str) -> list[Diagnostic]:
+        """Return diagnostics for path read so far."""
+        return [self.items[index] for index in self.by_file.get(path, ())]
+
+    def next(self) -> Diagnostic | None:
+        """Move to next diagnostic and return it, or None if at the end."""
+        while self.current + 1 >= len(self.items) and not self.is_complete():
+            self.ingest()
+        if self.current + 1 >= len(self.items):
+            return None
+        self.current += 1
+        return self.items[self.current]
+
+    def previous(self) -> Diagnostic | None:
+        """Move to previous diagnostic and return it, or None if at start."""
+        if self.current <= 0:
+            return None
+        self.current -= 1
+        return self.items[self.current]
+
+    def close(self) -> None:
+        """Stop reading report, keeping diagnostics read so far."""
+        if self.stream is None:
+            return
+        self.stream.close()
+        self.stream = None
@@ -0,0 +1,530 @@
+"""Headless Text Buffer."""
+
+# Programmed by CoolCat467
+
+from __future__ import annotations
+
+# IDLE Open Line Extension
+# Copyright (C) 2025  CoolCat467
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+__title__ = "textbuffer"
+__author__ = "CoolCat467"
+__license__ = "GNU General Public License Version 3"
+
+import operator
+import re
+from tkinter import TclError
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+# (line, column), line 1 based like Tk text indexes
+Position = tuple[int, int]
+Range = tuple[Position, Position]
+
+# `line.col` or `line.end`, otherwise a mark or `tag.first`/`tag.last`
+INDEX_BASE = re.compile(r"\s*(?:([0-9]+)\.([0-9]+|end)|([^\s+-]+))")
+# `+ 3 chars`, `-1l`, ` linestart` and the like
+INDEX_MODIFIER = re.compile(r"\s*(?:([+-])\s*([0-9]+)\s*([a-z]+)|([a-z]+))")
+CHAR_UNITS = frozenset(("c", "ch", "cha", "char", "chars", "i", "indices"))
+LINE_UNITS = frozenset(("l", "li", "lin", "line", "lines"))
+WORD_CHAR = re.compile(r"\w")
+
+COMPARE: dict[str, Callable[[Position, Position], bool]] = {
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    ">=": operator.ge,
+    ">": operator.gt,
+    "!=": operator.ne,
+}
+
+
+def merge_ranges(ranges: Iterable[Range]) -> list[Range]:
+    """Return sorted ranges with overlapping and touching ranges merged.
+
+    Empty ranges are left out.
+    """
+    merged: list[Range] = []
+    for start, end in sorted(ranges):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+            continue
+        merged.append((start, end))
+    return merged
+
+
+def format_position(position: Position) -> str:
+    """Return position as `line.col` index string."""
+    return f"{position[0]}.{position[1]}"
+
+
+class TextBuffer:
+    """In-process stand-in for tkinter.Text, no display needed.
+
+    Text is stored as a list of lines. Supports the index grammar
+    extension utilities use (`line.col`, `line.end`, `end`, marks,
+    `tag.first`/`tag.last`, `+N chars`, `-N lines`, `linestart`,
+    `lineend`, `wordstart` and `wordend`), marks with gravity, and
+    tags. Like Tk, there is always a final newline, which can not be
+    deleted. Display related methods do nothing.
+    """
+
+    __slots__ = ("lines", "marks", "options", "tags")
+
+    def __init__(self, chars: str = "") -> None:
+        """Initialize buffer holding chars."""
+        self.lines = chars.split("\n")
+        # Mark name to (position, gravity)
+        self.marks: dict[str, tuple[Position, str]] = {
+            "insert": ((1, 0), "right"),
+            "current": ((1, 0), "right"),
+        }
+        # Tag name to sorted, non overlapping ranges
+        self.tags: dict[str, list[Range]] = {"sel": []}
+        self.options: dict[str, object] = {"state": "normal"}
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"<{self.__class__.__name__} lines={len(self.lines)}>"
+
+    # Positions
+
+    def end(self) -> Position:
+        """Return position of `end`, just after the final newline."""
+        return (len(self.lines) + 1, 0)
+
+    def last(self) -> Position:
+        """Return position of `end-1c`, the final newline."""
+        return (len(self.lines), len(self.lines[-1]))
+
+    def normalize(self, line: int, col: int) -> Position:
+        """Return position clamped to the text."""
+        if line < 1:
+            return (1, 0)
+        if line > len(self.lines):
+            return self.end()
+        return (line, min(max(col, 0), len(self.lines[line - 1])))
+
+    def move_chars(self, position: Position, count: int) -> Position:
+        """Return position moved count characters, newlines included."""
+        line, col = position
+        if count >= 0:
+            while line <= len(self.lines):
+                remaining = len(self.lines[line - 1]) - col
+                if count <= remaining:
+                    return (line, col + count)
+                count -= remaining + 1
+                line += 1
+                col = 0
+            return self.end()
+        count = -count
+        while True:
+            if count <= col:
+                return (line, col - count)
+            count -= col + 1
+            line -= 1
+            if line < 1:
+                return (1, 0)
+            col = len(self.lines[line - 1])
+
+    def word_bounds(self, position: Position) -> Range:
+        """Return start and end of word at position."""
+        line, col = self.normalize(*position)
+        if line > len(self.lines):
+            return ((line, 0), (line, 0))
+        chars = self.lines[line - 1]
+        if col >= len(chars) or not WORD_CHAR.match(chars[col]):
+            return ((line, col), (line, col + 1))
+        start = col
+        while start > 0 and WORD_CHAR.match(chars[start - 1]):
+            start -= 1
+        end = col
+        while end < len(chars) and WORD_CHAR.match(chars[end]):
+            end += 1
+        return ((line, start), (line, end))
+
+    def get_base(self, name: str) -> Position:
+        """Return position of mark, `end`, or `tag.first`/`tag.last`."""
+        if name == "end":
+            return self.end()
+        if name in self.marks:
+            return self.marks[name][0]
+        tag, _, which = name.rpartition(".")
+        if which in {"first", "last"} and tag:
+            ranges = self.tags.get(tag)
+            if not ranges:
+                raise TclError(
+                    "text doesn't contain any characters tagged with "
+                    f'"{tag}"',
+                )
+            return ranges[0][0] if which == "first" else ranges[-1][1]
+        raise TclError(f'bad text index "{name}"')
+
+    def get_position(self, index: str) -> Position:
+        """Return position of index."""
+        match = INDEX_BASE.match(index)
+        if match is None:
+            raise TclError(f'bad text index "{index}"')
+        line_text, col_text, name = match.groups()
+        if name is not None:
+            position = self.get_base(name)
+        elif col_text == "end":
+            line = int(line_text)
+            position = self.normalize(line, 0)
+            if line <= len(self.lines):
+                position = (line, len(self.lines[line - 1]))
+        else:
+            position = self.normalize(int(line_text), int(col_text))
+
+        offset = match.end()
+        while offset < len(index):
+            modifier = INDEX_MODIFIER.match(index, offset)
+            if modifier is None:
+                if index[offset:].strip():
+                    raise TclError(f'bad text index "{index}"')
+                break
+            offset = modifier.end()
+            sign, count_text, unit, word = modifier.groups()
+            if word is not None:
+                position = self.apply_word_modifier(position, word, index)
+                continue
+            count = int(count_text) if sign == "+" else -int(count_text)
+            if unit in CHAR_UNITS:
+                position = self.move_chars(position, count)
+            elif unit in LINE_UNITS:
+                position = self.normalize(position[0] + count, position[1])
+            else:
+                raise TclError(f'bad text index "{index}"')
+        return position
+
+    def apply_word_modifier(
+        self,
+        position: Position,
+        word: str,
+        index: str,
+    ) -> Position:
+        """Return position after linestart/lineend/wordstart/wordend."""
+        line, _col = position
+        if word == "linestart":
+            return (line, 0)
+        if word == "lineend":
+            if line > len(self.lines):
+                return position
+            return (line, len(self.lines[line - 1]))
+        if word == "wordstart":
+            return self.word_bounds(position)[0]
+        if word == "wordend":
+            return self.word_bounds(position)[1]
+        raise TclError(f'bad text index "{index}"')
+
+    def get_range(self, index1: str, index2: str | None) -> Range:
+        """Return range from index1 to index2, or one character."""
+        start = self.get_position(index1)
+        if index2 is None:
+            return start, self.move_chars(start, 1)
+        return start, self.get_position(index2)
+
+    # Text
+
+    def index(self, index: str) -> str:
+        """Return index as `line.col`."""
+        return format_position(self.get_position(index))
+
+    def compare(self, index1: str, op: str, index2: str) -> bool:
+        """Return result of comparing index1 and index2 with op."""
+        if op not in COMPARE:
+            raise TclError(f'bad comparison operator "{op}"')
+        return COMPARE[op](
+            self.get_position(index1),
+            self.get_position(index2),
+        )
+
+    def get(self, index1: str, index2: str | None = None) -> str:
+        """Return text from index1 to index2, or character at index1."""
+        (line1, col1), (line2, col2) = self.get_range(index1, index2)
+        if (line2, col2) <= (line1, col1):
+            return ""
+        if line1 == line2:
+            return self.lines[line1 - 1][col1:col2]
+        chunks = [self.lines[line1 - 1][col1:]]
+        chunks.extend(self.lines[line1 : line2 - 1])
+        chunks.append(
+            self.lines[line2 - 1][:col2] if line2 <= len(self.lines) else "",
+        )
+        return "\n".join(chunks)
+
+    def insert(
+        self,
+        index: str,
+        chars: str,
+        tags: str | tuple[str, ...] | None = None,
+    ) -> None:
+        """Insert chars at index.
+
+        If tags are given, inserted text has exactly those tags, otherwise
+        it has tags on both sides of index.
+        """
+        if self.options["state"] == "disabled" or not chars:
+            return
+        position = min(self.get_position(index), self.last())
+        line, col = position
+        current = self.lines[line - 1]
+        new_lines = chars.split("\n")
+        added = len(new_lines) - 1
+        if not added:
+            self.lines[line - 1] = current[:col] + chars + current[col:]
+            end = (line, col + len(chars))
+        else:
+            new_lines[0] = current[:col] + new_lines[0]
+            end = (line + added, len(new_lines[-1]))
+            new_lines[-1] += current[col:]
+            self.lines[line - 1 : line] = new_lines
+
+        def shift(point: Position) -> Position:
+            if point[0] == line:
+                return (end[0], end[1] + point[1] - col)
+            return (point[0] + added, point[1])
+
+        for name, (point, gravity) in self.marks.items():
+            if point > position or (point == position and gravity == "right"):
+                self.marks[name] = (shift(point), gravity)
+        for tag, ranges in self.tags.items():
+            self.tags[tag] = merge_ranges(
+                (
+                    shift(start) if start >= position else start,
+                    shift(stop) if stop > position else stop,
+                )
+                for start, stop in ranges
+            )
+        if tags is not None:
+            for tag in self.tags:
+                self.remove_tag_range(tag, position, end)
+            for tag in tags.split() if isinstance(tags, str) else tags:
+                self.add_tag_range(tag, position, end)
+
+    def delete(self, index1: str, index2: str | None = None) -> None:
+        """Delete text from index1 to index2, or character at index1.
+
+        The final newline is never deleted.
+        """
+        if self.options["state"] == "disabled":
+            return
+        start, stop = self.get_range(index1, index2)
+        stop = min(stop, self.last())
+        if stop <= start:
+            return
+        (line1, col1), (line2, col2) = start, stop
+        self.lines[line1 - 1 : line2] = [
+            self.lines[line1 - 1][:col1] + self.lines[line2 - 1][col2:],
+        ]
+
+        def shift(point: Position) -> Position:
+            if point <= start:
+                return point
+            if point <= stop:
+                return start
+            if point[0] == line2:
+                return (line1, col1 + point[1] - col2)
+            return (point[0] - (line2 - line1), point[1])
+
+        for name, (point, gravity) in self.marks.items():
+            self.marks[name] = (shift(point), gravity)
+        for tag, ranges in self.tags.items():
+            self.tags[tag] = merge_ranges(
+                (shift(first), shift(last)) for first, last in ranges
+            )
+
+    # Marks
+
+    def mark_set(self, name: str, index: str) -> None:
+        """Set mark name at index."""
+        _position, gravity = self.marks.get(name, ((1, 0), "right"))
+        self.marks[name] = (self.get_position(index), gravity)
+
+    def mark_unset(self, *names: str) -> None:
+        """Remove marks, `insert` and `current` can not be removed."""
+        for name in names:
+            if name not in {"insert", "current"}:
+                self.marks.pop(name, None)
+
+    def mark_names(self) -> tuple[str, ...]:
+        """Return names of all marks."""
+        return tuple(self.marks)
+
+    def mark_gravity(self, name: str, direction: str | None = None) -> str:
+        """Return gravity of mark, setting it to direction if given."""
+        if name not in self.marks:
+            raise TclError(f'there is no mark named "{name}"')
+        position, gravity = self.marks[name]
+        if direction is not None:
+            if direction not in {"left", "right"}:
+                raise TclError(f'bad mark gravity "{direction}"')
+            self.marks[name] = (position, direction)
+            return direction
+        return gravity
+
+    # Tags
+
+    def add_tag_range(self, tag: str, start: Position, stop: Position) -> None:
+        """Add tag to characters from start to stop."""
+        ranges = self.tags.setdefault(tag, [])
+        if stop > start:
+            self.tags[tag] = merge_ranges([*ranges, (start, stop)])
+
+    def remove_tag_range(
+        self,
+        tag: str,
+        start: Position,
+        stop: Position,
+    ) -> None:
+        """Remove tag from characters from start to stop."""
+        ranges: list[Range] = []
+        for first, last in self.tags.get(tag, ()):
+            if last <= start or first >= stop:
+                ranges.append((first, last))
+                continue
+            if first < start:
+                ranges.append((first, start))
+            if last > stop:
+                ranges.append((stop, last))
+        if tag in self.tags:
+            self.tags[tag] = ranges
+
+    def iter_index_ranges(
+        self,
+        index1: str,
+        index2: str | None,
+        args: tuple[str, ...],
+    ) -> list[Range]:
+        """Return ranges from index1, index2 and further index pairs."""
+        indexes = [index1, index2, *args]
+        ranges = []
+        for offset in range(0, len(indexes), 2):
+            first = indexes[offset]
+            if first is None:
+                break
+            second = indexes[offset + 1] if offset + 1 < len(indexes) else None
+            start, stop = self.get_range(first, second)
+            ranges.append((start, min(stop, self.end())))
+        return ranges
+
+    def tag_add(
+        self,
+        tagName: str,  # noqa: N803
+        index1: str,
+        index2: str | None = None,
+        *args: str,
+    ) -> None:
+        """Add tag to ranges, or character at index if no end given."""
+        for start, stop in self.iter_index_ranges(index1, index2, args):
+            self.add_tag_range(tagName, start, stop)
+
+    def tag_remove(
+        self,
+        tagName: str,  # noqa: N803
+        index1: str,
+        index2: str | None = None,
+        *args: str,
+    ) -> None:
+        """Remove tag from ranges, or character at index if no end given."""
+        for start, stop in self.iter_index_ranges(index1, index2, args):
+            self.remove_tag_range(tagName, start, stop)
+
+    def tag_ranges(self, tagName: str) -> tuple[str, ...]:  # noqa: N803
+        """Return start and end indexes of every range with tag."""
+        return tuple(
+            format_position(position)
+            for stop_start in self.tags.get(tagName, ())
+            for position in stop_start
+        )
+
+    def tag_nextrange(
+        self,
+        tagName: str,  # noqa: N803
+        index1: str,
+        index2: str | None = None,
+    ) -> tuple[str, ...]:
+        """Return first range with tag starting from index1 to index2."""
+        start = self.get_position(index1)
+        stop = self.end() if index2 is None else self.get_position(index2)
+        for first, last in self.tags.get(tagName, ()):
+            if last <= start:
+                continue
+            first = max(first, start)
+            if first >= stop:
+                break
+            return format_position(first), format_position(last)
+        return ()
+
+    def tag_names(self, index: str | None = None) -> tuple[str, ...]:
+        """Return all tag names, or names of tags at index."""
+        if index is None:
+            return tuple(self.tags)
+        position = self.get_position(index)
+        return tuple(
+            tag
+            for tag, ranges in self.tags.items()
+            if any(first <= position < last for first, last in ranges)
+        )
+
+    def tag_delete(self, *tagNames: str) -> None:  # noqa: N803
+        """Remove tags entirely, `sel` is only emptied."""
+        for tag in tagNames:
+            if tag == "sel":
+                self.tags["sel"] = []
+            else:
+                self.tags.pop(tag, None)
+
+    def tag_configure(self, tagName: str, **kwargs: object) -> None:  # noqa: N803
+        """Create tag if needed. Display options are ignored."""
+        self.tags.setdefault(tagName, [])
+
+    tag_config = tag_configure
+
+    # Widget
+
+    def configure(self, **kwargs: object) -> None:
+        """Set widget options, only `state` has any effect."""
+        self.options.update(kwargs)
+
+    config = configure
+
+    def cget(self, key: str) -> object:
+        """Return widget option."""
+        return self.options.get(key, "")
+
+    def see(self, index: str) -> None:
+        """Do nothing, there is no view."""
+
+    def yview(self, *args: object) -> tuple[float, float] | None:
+        """Return whole text as visible, there is no view."""
+        if args:
+            return None
+        return (0.0, 1.0)
+
+    def bell(self) -> None:
+        """Do nothing, there is no display."""
+
+    def update_idletasks(self) -> None:
+        """Do nothing, there is no display."""
+
+    def focus_set(self) -> None:
+        """Do nothing, there is no display."""
@@ -24,21 +24,44 @@ __title__ = "extension-utils"
 __author__ = "CoolCat467"
 __license__ = "GNU General Public License Version 3"
 
+import atexit
+import cProfile
+import gzip
 import importlib
+import json
+import os
+import shutil
 import sys
+import threading
 import time
 import traceback
+from bisect import bisect_left, bisect_right
+from collections import deque
 from contextlib import contextmanager
 from functools import wraps
-from idlelib import search, searchengine
 from idlelib.config import idleConf
+from idlelib.delegator import Delegator
 from os.path import abspath
 from pathlib import Path
-from tkinter import TclError, Text, Tk, messagebox
+from tkinter import TclError, Text, messagebox
 from typing import TYPE_CHECKING, ClassVar, Literal, NamedTuple, TypeVar
 
+from idleopenline import fileposition
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
 if TYPE_CHECKING:
-    from collections.abc import Callable, Generator, Iterable, Sequence
+    from collections.abc import (
+        Callable,
+        Generator,
+        Iterable,
+        Mapping,
+        Sequence,
+    )
+    from idlelib import searchengine
     from idlelib.editor import EditorWindow
     from idlelib.format import FormatRegion
     from idlelib.iomenu import IOBinding
@@ -51,7 +74,31 @@ if TYPE_CHECKING:
 
 T = TypeVar("T")
 
+# Moved to fileposition so the instance launcher does not import tkinter,
+# still importable from here.
+int_default = fileposition.int_default
+FilePosition = fileposition.FilePosition
+parse_position_fields = fileposition.parse_position_fields
+FilePositionArray = fileposition.FilePositionArray
+
 LOGS_PATH = Path(idleConf.userdir) / "logs"
+# Most log entries waiting to be written, oldest are dropped past this
+LOG_QUEUE_SIZE = 1024
+# Seconds to wait for waiting log entries to be written at exit
+LOG_FLUSH_TIMEOUT = 5.0
+# Seconds the same exception is logged at most once in
+EXCEPTION_WINDOW = 60.0
+# Seconds between checks for exception repeat counts to summarize
+EXCEPTION_SUMMARY_INTERVAL = 10.0
+# Upper bounds in seconds of timing histogram buckets
+TIMING_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+# Seconds a call must take for its profile to be kept
+PROFILE_THRESHOLD = 0.5
+# Most profile files kept in LOGS_PATH, oldest are removed past this
+PROFILE_FILES = 20
+PROFILE_PREFIX = "profile-"
+# Seconds between attempts to take a file lock held by another process
+LOCK_POLL = 0.005
 TITLE: str = __title__
 
 
@@ -290,6 +337,22 @@ def ensure_values_exist_in_section(
     return need_save
 
 
+def get_config_snapshot() -> tuple[tuple[int, int] | None, ...]:
+    """Return (modification time, size) of extension configuration files.
+
+    Files that do not exist are None.
+    """
+    snapshot: list[tuple[int, int] | None] = []
+    for config in (idleConf.defaultCfg, idleConf.userCfg):
+        try:
+            stat = Path(config["extensions"].file).stat()
+        except OSError:
+            snapshot.append(None)
+        else:
+            snapshot.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(snapshot)
+
+
 def ask_save_dialog(parent: Text) -> bool:
     """Ask to save dialog. Return if ok to save.
 
@@ -365,35 +428,521 @@ def temporary_overwrite(
             setattr(object_, attribute, original)
 
 
+def format_log_entry(timestamp: float, content: str) -> str:
+    """Return content with every line prefixed by timestamp."""
+    format_time = time.strftime(
+        "[%Y-%m-%d %H:%M:%S] ",
+        time.localtime(timestamp),
+    )
+    lines = content.splitlines(keepends=True) or [""]
+    chars = "".join(f"{format_time}{line}" for line in lines)
+    if not chars.endswith("\n"):
+        chars += "\n"
+    return chars
+
+
+class LogRotation(NamedTuple):
+    """Log file rotation limits."""
+
+    # Rotate once log file is at least this many bytes, 0 to never
+    max_size: int = 1024 * 1024
+    # Rotate once first entry is this many seconds old, 0 to never
+    max_age: float = 30 * 24 * 60 * 60
+    # Compressed archives to keep, 0 to keep none
+    archives: int = 5
+
+
+LOG_ROTATION = LogRotation()
+
+
+def set_log_rotation(rotation: LogRotation) -> None:
+    """Set log file rotation limits."""
+    global LOG_ROTATION
+    LOG_ROTATION = rotation
+
+
+def get_log_archive(path: Path, number: int) -> Path:
+    """Return path of compressed log archive number, 1 being newest."""
+    return path.with_name(f"{path.name}.{number}.gz")
+
+
+def get_log_start(path: Path) -> float | None:
+    """Return timestamp of first entry in log file, or None if unknown."""
+    try:
+        with path.open("rb") as fp:
+            chars = fp.read(21).decode("ascii")
+        return time.mktime(time.strptime(chars, "[%Y-%m-%d %H:%M:%S]"))
+    except (OSError, ValueError):
+        return None
+
+
+def needs_rotation(path: Path, rotation: LogRotation) -> bool:
+    """Return True if log file is over size or age limits."""
+    try:
+        size = path.stat().st_size
+    except OSError:
+        return False
+    if size == 0:
+        return False
+    if rotation.max_size > 0 and size >= rotation.max_size:
+        return True
+    if rotation.max_age > 0:
+        start = get_log_start(path)
+        if start is not None and time.time() - start >= rotation.max_age:
+            return True
+    return False
+
+
+@contextmanager
+def try_lock_file(path: Path) -> Generator[bool, None, None]:
+    """Try to take a lock shared between processes, without waiting.
+
+    Yields True if lock was taken. The lock is held on the file by the
+    operating system, so it is released even if the holder dies. The
+    file is left in place, removing it would let another process lock
+    a file that is no longer at path.
+    """
+    fd = os.open(path, os.O_CREAT | os.O_RDWR)
+    try:
+        try:
+            if sys.platform == "win32":
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Held by someone else
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if sys.platform == "win32":
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def lock_file(path: Path, timeout: float) -> Generator[bool, None, None]:
+    """Take a lock shared between processes, waiting up to timeout seconds.
+
+    Yields True if lock was taken, see `try_lock_file`.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        with try_lock_file(path) as locked:
+            if locked or time.monotonic() >= deadline:
+                yield locked
+                return
+        time.sleep(LOCK_POLL)
+
+
+def rotate_log(path: Path, rotation: LogRotation | None = None) -> bool:
+    """Rotate log file into gzip archives if over limits.
+
+    Return True if rotated. Safe with several processes sharing the
+    log folder: only the process holding the rotation lock rotates, and
+    the log file is renamed away before it is compressed.
+    """
+    if rotation is None:
+        rotation = LOG_ROTATION
+    if not needs_rotation(path, rotation):
+        return False
+    with try_lock_file(path.with_name(f"{path.name}.lock")) as locked:
+        # Another process might have just rotated.
+        if not locked or not needs_rotation(path, rotation):
+            return False
+        rotating = path.with_name(f"{path.name}.{os.getpid()}.rotating")
+        os.replace(path, rotating)
+        try:
+            if rotation.archives <= 0:
+                return True
+            for number in range(rotation.archives - 1, 0, -1):
+                archive = get_log_archive(path, number)
+                if archive.exists():
+                    os.replace(archive, get_log_archive(path, number + 1))
+            compressed = path.with_name(f"{path.name}.{os.getpid()}.gz.tmp")
+            with rotating.open("rb") as source:
+                with gzip.open(compressed, "wb") as destination:
+                    shutil.copyfileobj(source, destination)
+            os.replace(compressed, get_log_archive(path, 1))
+        finally:
+            rotating.unlink(missing_ok=True)
+    return True
+
+
+def write_log_entries(entries: Iterable[tuple[Path, float, str]]) -> None:
+    """Append (path, timestamp, content) entries, opening each file once.
+
+    Log files over rotation limits are rotated first.
+    """
+    by_path: dict[Path, list[str]] = {}
+    for path, timestamp, content in entries:
+        by_path.setdefault(path, []).append(
+            format_log_entry(timestamp, content),
+        )
+    for path, chunks in by_path.items():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            rotate_log(path)
+        except OSError as exc:
+            # Still log, just to the oversized file.
+            print(f"Could not rotate log: {exc}", file=sys.stderr)
+        with path.open("a", encoding="utf-8") as fp:
+            fp.write("".join(chunks))
+
+
+class LogWriter:
+    """Write log entries from a single background thread.
+
+    Callers only queue entries, so they never wait on the disk. If more
+    than max_pending entries are waiting, the oldest are dropped, and a
+    note of how many were dropped is written in their place.
+
+    If set, periodic is called from the writer thread every interval
+    seconds, whether or not entries arrive, so it can queue entries.
+    """
+
+    __slots__ = (
+        "condition",
+        "dropped",
+        "interval",
+        "max_pending",
+        "pending",
+        "periodic",
+        "thread",
+        "writing",
+    )
+
+    def __init__(
+        self,
+        max_pending: int = LOG_QUEUE_SIZE,
+        periodic: Callable[[], object] | None = None,
+        interval: float = EXCEPTION_SUMMARY_INTERVAL,
+    ) -> None:
+        """Initialize writer keeping at most max_pending entries waiting."""
+        self.max_pending = max_pending
+        self.periodic = periodic
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.pending: deque[tuple[Path, float, str]] = deque()
+        self.dropped = 0
+        self.writing = False
+        self.thread: threading.Thread | None = None
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"{self.__class__.__name__}({self.max_pending!r})"
+
+    def put(self, path: Path, content: str) -> None:
+        """Queue content to be appended to log file at path."""
+        with self.condition:
+            while self.pending and len(self.pending) >= self.max_pending:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append((path, time.time(), content))
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run,
+                    name=f"{__title__}-log-writer",
+                    daemon=True,
+                )
+                self.thread.start()
+                atexit.register(self.flush, LOG_FLUSH_TIMEOUT)
+            self.condition.notify_all()
+
+    def take(
+        self,
+        timeout: float | None = None,
+    ) -> list[tuple[Path, float, str]]:
+        """Wait for entries, then return and clear all waiting entries.
+
+        Returns no entries if none arrive within timeout.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.pending, timeout):
+                return []
+            entries = list(self.pending)
+            self.pending.clear()
+            if self.dropped:
+                path, timestamp, _content = entries[0]
+                entries.insert(
+                    0,
+                    (path, timestamp, f"{self.dropped} log entries dropped"),
+                )
+                self.dropped = 0
+            self.writing = True
+            return entries
+
+    def run(self) -> None:
+        """Write entries as they arrive, forever."""
+        next_periodic = time.monotonic() + self.interval
+        while True:
+            timeout = None
+            if self.periodic is not None:
+                timeout = max(0.0, next_periodic - time.monotonic())
+            entries = self.take(timeout)
+            if self.periodic is not None and time.monotonic() >= next_periodic:
+                next_periodic = time.monotonic() + self.interval
+                try:
+                    self.periodic()
+                except Exception as exc:
+                    print(f"Periodic log call failed: {exc}", file=sys.stderr)
+            if not entries:
+                continue
+            try:
+                write_log_entries(entries)
+            except OSError as exc:
+                # Nowhere left to log to
+                print(f"Could not write log: {exc}", file=sys.stderr)
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait for queued entries to be written. Return False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.pending and not self.writing,
+                timeout,
+            )
+
+
+log_writer = LogWriter()
+
+
 def extension_log(content: str) -> None:
-    """Log content to extension log file."""
-    if not LOGS_PATH.exists():
-        LOGS_PATH.mkdir(exist_ok=True)
-    log_file = LOGS_PATH / f"{TITLE}.log"
-    with log_file.open("a", encoding="utf-8") as fp:
-        format_time = time.strftime("[%Y-%m-%d %H:%M:%S] ")
-        for line in content.splitlines(keepends=True):
-            fp.write(f"{format_time}{line}")
-        if not line.endswith("\n"):
-            fp.write("\n")
+    """Log content to extension log file.
+
+    Written by a background thread, see `flush_log`.
+    """
+    log_writer.put(LOGS_PATH / f"{TITLE}.log", content)
+
+
+def flush_log(timeout: float | None = None) -> bool:
+    """Wait for logged content to be written. Return False on timeout."""
+    return log_writer.flush(timeout)
+
+
+class ExceptionFingerprint(NamedTuple):
+    """Exception type and where it was raised from."""
+
+    type_name: str
+    # (filename, line number, function name) of each traceback frame
+    frames: tuple[tuple[str, int, str], ...]
+
+    @classmethod
+    def from_exception(cls, exc: BaseException) -> Self:
+        """Return fingerprint of exception."""
+        exc_type = type(exc)
+        return cls(
+            f"{exc_type.__module__}.{exc_type.__qualname__}",
+            tuple(
+                (frame.f_code.co_filename, line, frame.f_code.co_name)
+                for frame, line in traceback.walk_tb(exc.__traceback__)
+            ),
+        )
+
+    def describe(self) -> str:
+        """Return short description, naming innermost frame."""
+        if not self.frames:
+            return self.type_name
+        filename, line, function = self.frames[-1]
+        return f"{self.type_name} at {filename}:{line} in {function}"
+
+
+class ExceptionLimiter:
+    """Log each distinct exception at most once per window.
+
+    Repeats inside the window are only counted. Counts are reported by
+    summary lines once the window has passed.
+    """
+
+    __slots__ = ("lock", "seen", "summary_registered", "window")
+
+    def __init__(self, window: float = EXCEPTION_WINDOW) -> None:
+        """Initialize limiter logging each exception once per window."""
+        self.window = window
+        self.lock = threading.Lock()
+        # Fingerprint to (time last logged or summarized, repeats since)
+        self.seen: dict[ExceptionFingerprint, tuple[float, int]] = {}
+        # Set once summaries are registered to be logged at exit
+        self.summary_registered = False
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"{self.__class__.__name__}({self.window!r})"
+
+    def record(
+        self,
+        fingerprint: ExceptionFingerprint,
+        now: float,
+    ) -> int | None:
+        """Count exception. Return None if it should not be logged now.
+
+        Otherwise returns repeats not reported yet.
+        """
+        with self.lock:
+            last, repeats = self.seen.get(fingerprint, (None, 0))
+            if last is not None and now - last < self.window:
+                self.seen[fingerprint] = (last, repeats + 1)
+                return None
+            self.seen[fingerprint] = (now, 0)
+            return repeats
+
+    def pop_summaries(self, now: float, force: bool = False) -> list[str]:
+        """Return summary lines for repeats whose window has passed.
+
+        If force, summarize all repeats not reported yet.
+        """
+        summaries: list[str] = []
+        with self.lock:
+            for fingerprint, (last, repeats) in self.seen.items():
+                if not repeats:
+                    continue
+                if not force and now - last < self.window:
+                    continue
+                summaries.append(
+                    f"{fingerprint.describe()} repeated {repeats} times",
+                )
+                self.seen[fingerprint] = (now, 0)
+        return summaries
+
+
+exception_limiter = ExceptionLimiter()
+
+
+def log_exception_summaries(force: bool = False) -> None:
+    """Log repeat counts of exceptions that were not logged again."""
+    for summary in exception_limiter.pop_summaries(time.monotonic(), force):
+        extension_log(summary)
+
+
+# Summaries are logged even after exceptions stop being raised.
+log_writer.periodic = log_exception_summaries
 
 
 def extension_log_exception(exc: BaseException, print_: bool = True) -> None:
-    """Log exception to extension log."""
+    """Log exception to extension log.
+
+    The same exception raised from the same place is only logged once
+    per EXCEPTION_WINDOW seconds, repeats are counted and summarized.
+    """
+    fingerprint = ExceptionFingerprint.from_exception(exc)
+    repeats = exception_limiter.record(fingerprint, time.monotonic())
+    log_exception_summaries()
+    if repeats is None:
+        # Summarize repeats not logged again at exit.
+        if not exception_limiter.summary_registered:
+            exception_limiter.summary_registered = True
+            atexit.register(log_exception_summaries, True)
+        return
     exception_text = "".join(traceback.format_exception(exc))
+    if repeats:
+        exception_text = (
+            f"{fingerprint.describe()} repeated {repeats} times\n"
+            f"{exception_text}"
+        )
     extension_log(exception_text)
     if print_:
         print(exception_text, file=sys.stderr)
 
 
+class ProfileCapture:
+    """Profile calls, keeping `.prof` files of slow ones in LOGS_PATH.
+
+    Only one call is profiled at a time, calls made while another is
+    being profiled just run. Only the newest max_files profiles are kept.
+    """
+
+    __slots__ = ("enabled", "lock", "max_files", "saved", "threshold")
+
+    def __init__(
+        self,
+        threshold: float = PROFILE_THRESHOLD,
+        max_files: int = PROFILE_FILES,
+    ) -> None:
+        """Initialize disabled capture of calls slower than threshold."""
+        self.enabled = False
+        self.threshold = threshold
+        self.max_files = max_files
+        # Held while a call is being profiled
+        self.lock = threading.Lock()
+        # Profiles saved, keeps file names unique
+        self.saved = 0
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        name = self.__class__.__name__
+        return f"{name}({self.threshold!r}, {self.max_files!r})"
+
+    def call(
+        self,
+        name: str,
+        function: Callable[PS, T],
+        *args: PS.args,
+        **kwargs: PS.kwargs,
+    ) -> T:
+        """Return function result, profiling it if enabled."""
+        if not self.enabled or not self.lock.acquire(blocking=False):
+            return function(*args, **kwargs)
+        try:
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                return profile.runcall(function, *args, **kwargs)
+            finally:
+                if time.perf_counter() - start >= self.threshold:
+                    self.save(profile, name)
+        finally:
+            self.lock.release()
+
+    def save(self, profile: cProfile.Profile, name: str) -> Path:
+        """Write profile of call to name and prune old profiles."""
+        LOGS_PATH.mkdir(parents=True, exist_ok=True)
+        safe_name = "".join(
+            char if char.isalnum() or char in "._-" else "_" for char in name
+        )
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.saved += 1
+        path = LOGS_PATH / (
+            f"{PROFILE_PREFIX}{stamp}-{os.getpid()}-{self.saved}-"
+            f"{safe_name}.prof"
+        )
+        profile.dump_stats(path)
+        self.prune()
+        return path
+
+    def prune(self) -> list[Path]:
+        """Remove oldest profiles past max_files. Return removed paths."""
+        profiles = sorted(
+            LOGS_PATH.glob(f"{PROFILE_PREFIX}*.prof"),
+            key=lambda path: path.stat().st_mtime,
+        )
+        removed = profiles[: max(len(profiles) - self.max_files, 0)]
+        for path in removed:
+            path.unlink(missing_ok=True)
+        return removed
+
+
+profiler = ProfileCapture()
+
+
 def log_exceptions(function: Callable[PS, T]) -> Callable[PS, T]:
-    """Log any exceptions raised."""
+    """Log any exceptions raised.
+
+    Calls are profiled while `profiler` is enabled.
+    """
+    name = function.__qualname__
 
     @wraps(function)
     def wrapper(*args: PS.args, **kwargs: PS.kwargs) -> T:
         """Catch Exceptions, log them to log file, and re-raise."""
         try:
-            return function(*args, **kwargs)
+            return profiler.call(name, function, *args, **kwargs)
         except Exception as exc:
             extension_log_exception(exc)
             raise
@@ -402,13 +951,17 @@ def log_exceptions(function: Callable[PS, T]) -> Callable[PS, T]:
 
 
 def log_exceptions_catch(function: Callable[PS, T]) -> Callable[PS, T | None]:
-    """Log and catch any exceptions raised."""
+    """Log and catch any exceptions raised.
+
+    Calls are profiled while `profiler` is enabled.
+    """
+    name = function.__qualname__
 
     @wraps(function)
     def wrapper(*args: PS.args, **kwargs: PS.kwargs) -> T | None:
         """Catch Exceptions, log them to log file. Return None on error."""
         try:
-            return function(*args, **kwargs)
+            return profiler.call(name, function, *args, **kwargs)
         except Exception as exc:
             extension_log_exception(exc)
             return None
@@ -416,6 +969,123 @@ def log_exceptions_catch(function: Callable[PS, T]) -> Callable[PS, T | None]:
     return wrapper
 
 
+class TimingStats:
+    """Call count and latency histogram of one entry point."""
+
+    __slots__ = ("buckets", "calls", "maximum", "total")
+
+    def __init__(self) -> None:
+        """Initialize empty stats."""
+        self.calls = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        # Calls per TIMING_BUCKETS bound, last counts slower calls
+        self.buckets = [0] * (len(TIMING_BUCKETS) + 1)
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"<{self.__class__.__name__} calls={self.calls}>"
+
+    def add(self, seconds: float) -> None:
+        """Record one call taking seconds."""
+        self.calls += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        self.buckets[bisect_left(TIMING_BUCKETS, seconds)] += 1
+
+    def as_dict(self) -> dict[str, object]:
+        """Return stats as JSON serializable dict."""
+        bounds = [*map(str, TIMING_BUCKETS), "inf"]
+        return {
+            "calls": self.calls,
+            "total": self.total,
+            "mean": self.total / self.calls if self.calls else 0.0,
+            "max": self.maximum,
+            "histogram": dict(zip(bounds, self.buckets, strict=True)),
+        }
+
+
+class Timings:
+    """Timing stats of instrumented entry points, by name.
+
+    Disabled by default, instrumented calls then only check `enabled`.
+    """
+
+    __slots__ = ("enabled", "lock", "stats")
+
+    def __init__(self) -> None:
+        """Initialize disabled timings."""
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.stats: dict[str, TimingStats] = {}
+
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"<{self.__class__.__name__} enabled={self.enabled}>"
+
+    def record(self, name: str, seconds: float) -> None:
+        """Record call to name taking seconds."""
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = TimingStats()
+            stats.add(seconds)
+
+    @contextmanager
+    def measure(self, name: str) -> Generator[None, None, None]:
+        """Record time spent in block as a call to name, if enabled."""
+        if not self.enabled:
+            yield None
+            return
+        start = time.perf_counter()
+        try:
+            yield None
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_dict(self) -> dict[str, dict[str, object]]:
+        """Return all stats as JSON serializable dict."""
+        with self.lock:
+            return {
+                name: stats.as_dict()
+                for name, stats in sorted(self.stats.items())
+            }
+
+    def dump(self, path: Path) -> None:
+        """Write stats to JSON file at path."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(self.as_dict(), indent=2) + "\n",
+            encoding="utf-8",
+        )
+
+    def reset(self) -> None:
+        """Forget all stats."""
+        with self.lock:
+            self.stats.clear()
+
+
+timings = Timings()
+
+
+def timed(function: Callable[PS, T]) -> Callable[PS, T]:
+    """Record call count and latency of function in `timings`."""
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @wraps(function)
+    def wrapper(*args: PS.args, **kwargs: PS.kwargs) -> T:
+        """Call function, timing it if timings are enabled."""
+        if not timings.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings.record(name, time.perf_counter() - start)
+
+    return wrapper
+
+
 class Comment(NamedTuple):
     """Represents one comment."""
 
@@ -440,97 +1110,138 @@ class Comment(NamedTuple):
         return self._replace(contents=contents)
 
 
-def int_default(text: str, default: int = 0) -> int:
-    """Return text as int or default if there is a ValueError."""
-    try:
-        return int(text)
-    except ValueError:
-        return default
+def merge_intervals(
+    intervals: Iterable[tuple[int, int]],
+) -> list[tuple[int, int]]:
+    """Return sorted inclusive intervals with overlapping and touching merged.
 
+    Empty intervals, where end is before start, are left out.
+    """
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if end < start:
+            continue
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+            continue
+        merged.append((start, end))
+    return merged
+
+
+class CommentLineIndex(Delegator):
+    """Sorted line numbers of extension comment lines in a text widget.
+
+    Sits in the window's percolator, so every insert and delete updates
+    the index by rescanning only the lines that changed.
+    """
 
-class FilePosition(NamedTuple):
-    """File Position."""
-
-    path: str
-    line: int
-    col: int
-    line_end: int
-    col_end: int
-
-    def is_range(self) -> bool:
-        """Return True if file position covers a range."""
-        return self.line != self.line_end or self.col != self.col_end
-
-    def as_select(self) -> tuple[str, str]:
-        """Return text selection region index strings."""
-        return f"{self.line}.{self.col}", f"{self.line_end}.{self.col_end}"
+    __slots__ = ("lines", "prefix", "text")
 
-    def delta_column(self, delta: int = -1) -> Self:
-        """Return position but with delta added to column."""
-        return self._replace(col=self.col + delta)
+    def __init__(self, text: Text, prefix: str) -> None:
+        """Initialize index of lines in text starting with prefix."""
+        super().__init__()
+        self.text = text
+        self.prefix = prefix
+        self.lines: list[int] = []
+        self.update(1, self.get_line("end-1c"), 0)
 
-    @classmethod
-    def parse(cls, file_position: str) -> Self:
-        """Parse file position string."""
-        line = 0
-        line_end = 0
-        col = 0
-        col_end = 0
-
-        windows_drive_letter = ""
-        if sys.platform == "win32":
-            windows_drive_letter, file_position = file_position.split(":", 1)
-            windows_drive_letter += ":"
-        position = file_position.rsplit(":", 5)
-
-        filename = position[0]
-        if len(position) > 1:
-            line = int_default(position[1])
-            line_end = line
-        if len(position) > 2:
-            col = int_default(position[2])
-            col_end = col
-        if len(position) > 4:
-            line_end = int_default(position[3], line_end)
-            col_end = int_default(position[4], col_end)
-
-        # If line end is before beginning, swap.
-        if line_end < line:
-            line, line_end = line_end, line
-            col, col_end = col_end, col
+    def __repr__(self) -> str:
+        """Return representation of self."""
+        return f"{self.__class__.__name__}({self.prefix!r})"
+
+    def get_line(self, index: str) -> int:
+        """Return line number of index, at most the last line."""
+        line, _col = get_line_col(self.text.index(index))
+        end, _col = get_line_col(self.text.index("end-1c"))
+        return min(line, end)
+
+    def update(self, first: int, last: int, delta: int) -> None:
+        """Rescan lines first to last after they changed by delta lines."""
+        lower = bisect_left(self.lines, first)
+        upper = bisect_right(self.lines, last)
+        tail = [line + delta for line in self.lines[upper:]]
+        chars = self.text.get(f"{first}.0", f"{last + delta}.end")
+        self.lines[lower:] = [
+            line
+            for line, line_text in enumerate(chars.split("\n"), first)
+            if line_text.lstrip().startswith(self.prefix)
+        ] + tail
+
+    def insert(
+        self,
+        index: str,
+        chars: str,
+        tags: str | tuple[str, ...] | None = None,
+    ) -> None:
+        """Insert chars at index and update index."""
+        first = self.get_line(index)
+        self.delegate.insert(index, chars, tags)  # type: ignore[attr-defined]
+        self.update(first, first, chars.count("\n"))
+
+    def delete(self, index1: str, index2: str | None = None) -> None:
+        """Delete from index1 to index2 and update index."""
+        if index2 is not None and self.text.compare(index2, "<=", index1):
+            # Empty or reversed range, Tk deletes nothing.
+            return
+        first = self.get_line(index1)
+        last = self.get_line(f"{index1}+1c" if index2 is None else index2)
+        self.delegate.delete(index1, index2)  # type: ignore[attr-defined]
+        self.update(first, last, first - last)
+
+    def next_line(self, line: int, wrap: bool = True) -> int | None:
+        """Return first comment line after line, or None."""
+        index = bisect_right(self.lines, line)
+        if index < len(self.lines):
+            return self.lines[index]
+        if wrap and self.lines:
+            return self.lines[0]
+        return None
+
+    def previous_line(self, line: int, wrap: bool = True) -> int | None:
+        """Return last comment line before line, or None."""
+        index = bisect_left(self.lines, line)
+        if index > 0:
+            return self.lines[index - 1]
+        if wrap and self.lines:
+            return self.lines[-1]
+        return None
+
+
+def comment_text_exists(
+    existing: Mapping[str, Sequence[int]],
+    texts: Sequence[str],
+    comment_line: str,
+    first: int,
+    last: int,
+) -> bool:
+    """Return if comment_line starts an existing text on lines first to last.
 
-        return cls(
-            path=f"{windows_drive_letter}{filename}",
-            line=line,
-            col=col,
-            line_end=line_end,
-            col_end=col_end,
-        )
+    Arguments:
+    ---------
+        existing: Comment texts to sorted line numbers.
+        texts: Sorted keys of existing.
 
-    def serialize(self) -> str:
-        """Return file position as string."""
-        if self.is_range():
-            return f"{self.path}:{self.line}:{self.col}:{self.line_end}:{self.col_end}"
-        if self.col != 0:
-            return f"{self.path}:{self.line}:{self.col}"
-        return f"{self.path}:{self.line}"
+    Texts starting with comment_line, such as the same comment with an
+    error code after it, sort right after it, so only texts that match
+    are looked at.
 
-    @classmethod
-    def from_editor_current(cls, editwin: PyShellEditorWindow) -> Self | None:
-        """Return file position from editwin current position."""
-        current_filename = editwin.io.filename
-        if current_filename is None:
-            return None
-        current_filename = str(Path(current_filename).absolute())
-        selected = get_selected_text_indexes(editwin.text)
-        select_string = (":".join(selected)).replace(".", ":")
-        return cls.parse(f"{current_filename}:{select_string}")
+    """
+    position = bisect_left(texts, comment_line)
+    while position < len(texts) and texts[position].startswith(comment_line):
+        found = existing[texts[position]]
+        index = bisect_left(found, first)
+        if index < len(found) and found[index] <= last:
+            return True
+        position += 1
+    return False
 
 
 class BaseExtension:
     """Base extension class."""
 
     __slots__ = (
+        "comment_lines",
         "comment_prefix",
         "editwin",
         "files",
@@ -555,6 +1266,11 @@ class BaseExtension:
     # Default key binds for configuration file
     bind_defaults: ClassVar[dict[str, str | None]] = {}
 
+    # Set once reload has loaded class variables from configuration
+    config_loaded: ClassVar[bool] = False
+    # Configuration files snapshot from last reload
+    config_snapshot: ClassVar[tuple[tuple[int, int] | None, ...]] = ()
+
     def __init__(
         self,
         editwin: PyShellEditorWindow,
@@ -572,6 +1288,8 @@ class BaseExtension:
         if comment_prefix is None:
             comment_prefix = f"{self.__class__.__name__}"
         self.comment_prefix = f"# {comment_prefix}: "
+        # Built on first comment navigation
+        self.comment_lines: CommentLineIndex | None = None
 
         self.bind_non_keyboard(self.bind_defaults)
 
@@ -691,15 +1409,27 @@ class BaseExtension:
         return need_save
 
     @classmethod
+    @timed
     def reload(cls) -> None:
-        """Load class variables from configuration."""
+        """Load class variables from configuration.
+
+        Does nothing if extension configuration files have not changed
+        since last reload.
+        """
+        if cls.config_loaded and get_config_snapshot() == cls.config_snapshot:
+            return
+
         # Ensure file default values exist so they appear in settings menu
         save = cls.ensure_config_exists()
         if cls.ensure_bindings_exist() or save:
-            idleConf.SaveUserCfgFiles()
+            # Only the user extensions file is ever edited
+            idleConf.userCfg["extensions"].Save()
 
-        # Reload configuration file
-        idleConf.LoadCfgFiles()
+        # Snapshot before reading so later changes are not missed.
+        cls.config_snapshot = get_config_snapshot()
+        # Reload extension configuration files
+        for config in (idleConf.defaultCfg, idleConf.userCfg):
+            config["extensions"].Load()
 
         # For all possible configuration values
         for key, default in cls.values.items():
@@ -712,6 +1442,7 @@ class BaseExtension:
                     default=default,
                 )
                 setattr(cls, key, value)
+        cls.config_loaded = True
 
     def get_tabwidth_indent_spaces(self) -> str:
         """Return tabwidth indent as spaces."""
@@ -771,6 +1502,13 @@ class BaseExtension:
             text_win=text_win,
         )
 
+    def get_file_editwin(self, file: str) -> EditorWindow | None:
+        """Return editor window for file, opening it if not current file."""
+        open_file: str | None = self.files.filename
+        if open_file is not None and abspath(open_file) == file:
+            return self.editwin
+        return self.flist.open(file)
+
     def add_comment(
         self,
         comment: Comment,
@@ -790,14 +1528,9 @@ class BaseExtension:
         line = comment.line
         msg = comment.contents
 
-        editwin: EditorWindow = self.editwin
-
-        open_file: str | None = self.files.filename
-        if open_file is None or abspath(open_file) != file:
-            opened = self.flist.open(file)
-            if opened is None:
-                return False
-            editwin = opened
+        editwin = self.get_file_editwin(file)
+        if editwin is None:
+            return False
 
         # If there is already a comment from us there, ignore that line.
         # +1-1 is so at least up by 1 is checked, range(0) = []
@@ -822,7 +1555,11 @@ class BaseExtension:
         editwin.text.insert(start, chars, ())
         return True
 
-    def get_pointers(self, comments: list[Comment]) -> Comment | None:
+    def get_pointers(
+        self,
+        comments: Sequence[Comment],
+        next_line_text: str | None = None,
+    ) -> Comment | None:
         """Return comment pointing to multiple comments all on the same line.
 
         If none of the comment pointers are going to be visible
@@ -833,18 +1570,14 @@ class BaseExtension:
 
         Messages must all be on the same line and be in the same file,
         otherwise ValueError is raised.
+
+        next_line_text is the text of the line after the comments, read
+        from the current file if not given.
         """
         line = comments[0].line
         file = comments[0].file
 
-        # Figure out next line intent
-        next_line_text = self.get_line(line + 1)
-        _uses_tabs, indent = get_line_indent_handle_tabs(next_line_text)
-
-        lastcol = len(self.get_comment_line(indent, ""))
-
-        columns: set[int] = set()
-
+        spans: list[tuple[int, int]] = []
         for comment in comments:
             if comment.line != line:
                 raise ValueError(f"Comment `{comment}` not on line `{line}`")
@@ -854,22 +1587,169 @@ class BaseExtension:
                 end = comment.column
             else:
                 end = comment.column_end
-            for col in range(comment.column, end + 1):
-                columns.add(col)
+            spans.append((comment.column, end))
+
+        # Figure out next line intent
+        if next_line_text is None:
+            next_line_text = self.get_line(line + 1)
+        _uses_tabs, indent = get_line_indent_handle_tabs(next_line_text)
+
+        lastcol = len(self.get_comment_line(indent, ""))
 
         new_line = ""
-        for col in sorted(columns):
-            spaces = (col - lastcol) - 1
-            if spaces < 0:
+        for start, end in merge_intervals(spans):
+            # Columns hidden behind the comment prefix are skipped.
+            start = max(start, lastcol + 1)
+            if start > end:
                 continue
-            new_line += " " * spaces + "^"
-            lastcol = col
+            new_line += " " * (start - lastcol - 1) + "^" * (end - start + 1)
+            lastcol = end
 
         if not new_line.strip():
             return None
 
         return Comment(file=file, line=line + 1, contents=new_line)
 
+    def get_pointers_batch(
+        self,
+        comments: Sequence[Comment],
+        file_lines: Mapping[str, Sequence[str]] | None = None,
+    ) -> list[Comment]:
+        """Return pointer comments for every line comments are on.
+
+        Comments are grouped by file and line, in first seen order.
+        Groups with no visible pointers are left out.
+
+        file_lines maps file to its lines without newlines, lines[0]
+        being line 1. Files not in it are read from their editor window.
+        """
+        groups: dict[tuple[str, int], list[Comment]] = {}
+        for comment in comments:
+            groups.setdefault((comment.file, comment.line), []).append(
+                comment,
+            )
+        read_lines = dict(file_lines or {})
+
+        pointers: list[Comment] = []
+        for (file, line), group in groups.items():
+            lines = read_lines.get(file)
+            if lines is None:
+                editwin = self.get_file_editwin(file)
+                if editwin is None:
+                    continue
+                lines = editwin.text.get("1.0", "end-1c").split("\n")
+                read_lines[file] = lines
+            next_line_text = lines[line] if 0 <= line < len(lines) else ""
+            pointer = self.get_pointers(group, next_line_text)
+            if pointer is not None:
+                pointers.append(pointer)
+        return pointers
+
+    def get_comment_index(self, lines: Sequence[str]) -> dict[str, list[int]]:
+        """Return extension comment texts to sorted line numbers.
+
+        Texts run from each comment prefix to the end of its line, so
+        comments after code and on indented lines are included.
+
+        Arguments:
+        ---------
+            lines: Lines of file without newlines, lines[0] is line 1.
+
+        """
+        prefix = self.comment_prefix
+        index: dict[str, list[int]] = {}
+        for line, chars in enumerate(lines, 1):
+            start = chars.find(prefix)
+            while start != -1:
+                index.setdefault(chars[start:], []).append(line)
+                start = chars.find(prefix, start + 1)
+        return index
+
+    def get_comment_insertions(
+        self,
+        lines: Sequence[str],
+        comments: Sequence[Comment],
+        max_exist_up: int = 0,
+    ) -> tuple[dict[int, str], list[int]]:
+        """Return comment lines to insert before lines and lines commented.
+
+        Arguments:
+        ---------
+            lines: Lines of file without newlines, lines[0] is line 1.
+            max_exist_up: Max distance upwards to look for comment to already exist.
+
+        Comment line numbers are all from before any insertion.
+        Insertions map a line number to the text to insert at the start
+        of that line.
+
+        """
+        existing = self.get_comment_index(lines)
+        texts = sorted(existing)
+        pending: dict[int, dict[str, None]] = {}
+        added: list[int] = []
+        for comment in reversed(comments):
+            line = comment.line
+            contents = comment.contents
+            batch = pending.setdefault(line, {})
+            if contents in batch:
+                continue
+            # Same lines add_comment checks, target line included
+            if comment_text_exists(
+                existing,
+                texts,
+                self.get_comment_line(0, contents),
+                line - max_exist_up,
+                line,
+            ):
+                continue
+            batch[contents] = None
+            added.append(line)
+
+        tab_spaces = self.get_tabwidth_indent_spaces()
+        insertions: dict[int, str] = {}
+        for line, batch in pending.items():
+            if not batch:
+                continue
+            chars = lines[line - 1] if 0 < line <= len(lines) else ""
+            uses_tabs = chars.startswith("\t")
+            if uses_tabs:
+                chars = chars.replace("\t", tab_spaces)
+            indent = get_line_indent(chars)
+            # Batch was built bottom to top
+            block = "".join(
+                f"{self.get_comment_line(indent, contents)}\n"
+                for contents in reversed(batch)
+            )
+            if uses_tabs:
+                block = self.reinstate_char_tabs(block)
+            insertions[line] = block
+        return insertions, added
+
+    def add_file_comments(
+        self,
+        editwin: EditorWindow,
+        comments: Sequence[Comment],
+        max_exist_up: int = 0,
+    ) -> list[int]:
+        """Add comments to file open in editwin. Return lines commented.
+
+        Reads the text once, then inserts each line's comments with one
+        edit, bottom to top so line numbers stay valid.
+
+        Does not use an undo block, please use one yourself.
+        """
+        text = editwin.text
+        lines = text.get("1.0", "end-1c").split("\n")
+        insertions, added = self.get_comment_insertions(
+            lines,
+            comments,
+            max_exist_up,
+        )
+        for line in sorted(insertions, reverse=True):
+            text.insert(f"{line}.0", insertions[line], ())
+        return added
+
+    @timed
     def add_comments(
         self,
         comments: Sequence[Comment],
@@ -878,16 +1758,22 @@ class BaseExtension:
 
         Return dict of per file a list of lines were a comment was added.
 
-        Changes are wrapped in an undo block.
+        Changes to each file are wrapped in one undo block.
         """
-        file_comments: dict[str, list[int]] = {}
+        by_file: dict[str, list[Comment]] = {}
+        for comment in comments:
+            by_file.setdefault(comment.file, []).append(comment)
 
-        with undo_block(self.undo):
-            total = len(comments)
-            for comment in reversed(comments):
-                if self.add_comment(comment, total):
-                    file_comments.setdefault(comment.file, [])
-                    file_comments[comment.file].append(comment.line)
+        file_comments: dict[str, list[int]] = {}
+        total = len(comments)
+        for file, file_group in by_file.items():
+            editwin = self.get_file_editwin(file)
+            if editwin is None:
+                continue
+            with undo_block(editwin.undo):
+                added = self.add_file_comments(editwin, file_group, total)
+            if added:
+                file_comments[file] = added
         return file_comments
 
     def add_comment_block(
@@ -916,6 +1802,46 @@ class BaseExtension:
         )
         return file_comments.get(file, [])
 
+    def find_extension_comment_lines(
+        self,
+        lines: Iterable[str],
+        first_line: int = 1,
+    ) -> list[int]:
+        """Return line numbers of extension comment lines.
+
+        lines are lines of text without newlines, starting at first_line.
+        """
+        return [
+            line
+            for line, chars in enumerate(lines, first_line)
+            # If after indent there is extension comment
+            if chars.lstrip().startswith(self.comment_prefix)
+        ]
+
+    def remove_lines(self, lines: Iterable[int]) -> None:
+        """Remove lines, deleting each run of adjacent lines at once.
+
+        Changes are wrapped in an undo block.
+        """
+        ranges = merge_intervals((line, line) for line in lines)
+        with undo_block(self.undo):
+            # Bottom up so line numbers above stay valid
+            for first, last in reversed(ranges):
+                self.text.delete(*get_line_selection(first, last - first + 1))
+
+    def remove_extension_comment_lines(self) -> list[int]:
+        """Remove all extension comment lines in one pass.
+
+        Return removed line numbers, numbered from before removal.
+
+        Changes are wrapped in an undo block.
+        """
+        lines = self.text.get("1.0", "end-1c").split("\n")
+        removed = self.find_extension_comment_lines(lines)
+        if removed:
+            self.remove_lines(removed)
+        return removed
+
     def remove_selected_extension_comments(self) -> bool:
         """Remove selected extension comments. Return if removed any comments.
 
@@ -925,72 +1851,76 @@ class BaseExtension:
         head, _tail, _chars, lines = self.formatter.get_region()
         region_start, _col = get_line_col(head)
 
-        edited = False
-        with undo_block(self.undo):
-            for index, line_text in reversed(tuple(enumerate(lines))):
-                # If after indent there is mypy comment
-                if line_text.lstrip().startswith(self.comment_prefix):
-                    # If so, remove line
-                    self.text.delete(
-                        *get_line_selection(index + region_start),
-                    )
-                    edited = True
-        if not edited:
+        removed = self.find_extension_comment_lines(lines, region_start)
+        if removed:
+            self.remove_lines(removed)
+        else:
             # Make bell sound so user knows this ran even though
             # nothing happened.
             self.text.bell()
-        return edited
+        return bool(removed)
 
     def remove_all_extension_comments(self) -> str:
         """Remove all extension comments.
 
         Changes are wrapped in an undo block.
         """
-        eof_idx = self.text.index("end")
-        chars = self.text.get("0.0", eof_idx)
-
-        lines = chars.splitlines()
-
-        edited = False
-        with undo_block(self.undo):
-            for index, line_text in reversed(tuple(enumerate(lines))):
-                # If after indent there is mypy comment
-                if line_text.lstrip().startswith(self.comment_prefix):
-                    # If so, remove line
-                    self.text.delete(*get_line_selection(index))
-                    edited = True
-        if not edited:
+        if not self.remove_extension_comment_lines():
             # Make bell sound so user knows this ran even though
             # nothing happened.
             self.text.bell()
         return "break"
 
+    def get_comment_line_index(self) -> CommentLineIndex:
+        """Return extension comment line index for this window.
+
+        Built on first use, then kept up to date as the text changes.
+        Sits below the undo delegator so undo, redo and progressive
+        loading, which all write below it, update the index too.
+        """
+        if self.comment_lines is None:
+            self.comment_lines = CommentLineIndex(
+                self.text,
+                self.comment_prefix,
+            )
+            self.editwin.per.insertfilterafter(
+                self.comment_lines,
+                self.editwin.undo,
+            )
+        return self.comment_lines
+
+    def goto_extension_comment(self, line: int | None, back: bool) -> bool:
+        """Select comment prefix on line. Return False and bell if None."""
+        if line is None:
+            self.text.bell()
+            return False
+        chars = self.get_line(line)
+        first = f"{line}.0"
+        last = f"{line}.{get_line_indent(chars) + len(self.comment_prefix)}"
+        self.text.tag_remove("sel", "1.0", "end")
+        self.text.tag_add("sel", first, last)
+        self.text.mark_set("insert", first if back else last)
+        self.text.see("insert")
+        return True
+
+    @timed
     def find_next_extension_comment(self, search_wrap: bool = True) -> bool:
-        """Find next extension comment by hacking the search dialog engine.
+        """Find next extension comment after the current line.
 
         Return True if the search was successful and False otherwise.
         """
-        root: Tk = self.editwin.root
-
-        # Get search engine singleton from root
-        engine: searchengine.SearchEngine = searchengine.get(root)
-
-        # With search engine parameter restore block
-        with search_engine_block(engine):
-            # Set search pattern to comment starter
-            set_search_engine_params(
-                engine,
-                {
-                    "pat": f"^\\s*{self.comment_prefix}",
-                    "re": True,
-                    "case": True,
-                    "word": False,
-                    "wrap": search_wrap,
-                    "back": False,
-                },
-            )
+        line, _col = get_line_col(self.text.index("insert"))
+        found = self.get_comment_line_index().next_line(line, search_wrap)
+        return self.goto_extension_comment(found, back=False)
 
-            # Find current pattern
-            found = search.find_again(self.text)
-            assert isinstance(found, bool)
-            return found
+    def find_previous_extension_comment(
+        self,
+        search_wrap: bool = True,
+    ) -> bool:
+        """Find previous extension comment before the current line.
+
+        Return True if the search was successful and False otherwise.
+        """
+        line, _col = get_line_col(self.text.index("insert"))
+        found = self.get_comment_line_index().previous_line(line, search_wrap)
+        return self.goto_extension_comment(found, back=True)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import sys
+from typing import TYPE_CHECKING, Final
+
+import pytest
+
+from idleopenline import extension, fileposition
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+IS_WINDOWS: Final = sys.platform == "win32"
+
+
+@pytest.mark.skipif(
+    IS_WINDOWS,
+    reason="Skipping Unix-specific tests on Windows",
+)
+def test_split_position(tmp_path: Path) -> None:
+    path = str(tmp_path / "file.py")
+    assert extension.split_position(path) is None
+    assert extension.split_position(
+        f"{path}:32:4",
+    ) == fileposition.FilePosition(
+        path,
+        32,
+        4,
+        32,
+        4,
+    )
+    assert extension.split_position(
+        f"{path}:1:2:3:4",
+    ) == fileposition.FilePosition(
+        path,
+        1,
+        2,
+        3,
+        4,
+    )
+    # Colon that is part of the name, not a position
+    assert extension.split_position(f"{path}:fish") is None
+
+
+@pytest.mark.skipif(
+    IS_WINDOWS,
+    reason="Skipping Unix-specific tests on Windows",
+)
+def test_split_position_existing(tmp_path: Path) -> None:
+    # File that really has a position like name
+    path = tmp_path / "file.py:32"
+    path.touch()
+    assert extension.split_position(str(path)) is None
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import io
+import sys
+from typing import Final
+
+import pytest
+
+from idleopenline import fileposition, utils
+
+IS_WINDOWS: Final = sys.platform == "win32"
+
+
+@pytest.mark.parametrize(
+    ("text", "expect"),
+    [("12", 12), ("-3", -3), ("", 0), ("x", 0)],
+)
+def test_int_default(text: str, expect: int) -> None:
+    assert fileposition.int_default(text) == expect
+
+
+def test_utils_names() -> None:
+    # Importers of the names from utils keep working.
+    assert utils.FilePosition is fileposition.FilePosition
+    assert utils.int_default is fileposition.int_default
+    assert utils.FilePositionArray is fileposition.FilePositionArray
+    assert utils.parse_position_fields is fileposition.parse_position_fields
+
+
+@pytest.mark.skipif(
+    IS_WINDOWS,
+    reason="Skipping Unix-specific tests on Windows",
+)
+def test_fileposition_parse_unix() -> None:
+    assert fileposition.FilePosition.parse(
+        "src/idleopenline/utils.py:59",
+    ) == fileposition.FilePosition("src/idleopenline/utils.py", 59, 0, 59, 0)
+    assert fileposition.FilePosition.parse(
+        "src/idleopenline/utils.py:59:43",
+    ) == fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        59,
+        43,
+    )
+    assert fileposition.FilePosition.parse(
+        "src/idleopenline/utils.py:59:43:60",
+    ) == fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        59,
+        43,
+    )
+    assert fileposition.FilePosition.parse(
+        "src/idleopenline/utils.py:59:43:60:48",
+    ) == fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        60,
+        48,
+    )
+    assert fileposition.FilePosition.parse(
+        "src/idleopenline/utils.py:59:43:60:48:103",
+    ) == fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        60,
+        48,
+    )
+
+
+@pytest.mark.skipif(
+    not IS_WINDOWS,
+    reason="Skipping Windows-specific tests on non-Windows platforms",
+)
+def test_fileposition_parse_windows() -> None:
+    assert fileposition.FilePosition.parse(
+        "C:\\path\\to\\file.py:59",
+    ) == fileposition.FilePosition("C:\\path\\to\\file.py", 59, 0, 59, 0)
+    assert fileposition.FilePosition.parse(
+        "C:\\path\\to\\file.py:59:43",
+    ) == fileposition.FilePosition(
+        "C:\\path\\to\\file.py",
+        59,
+        43,
+        59,
+        43,
+    )
+    assert fileposition.FilePosition.parse(
+        "C:\\path\\to\\file.py:59:43:60",
+    ) == fileposition.FilePosition(
+        "C:\\path\\to\\file.py",
+        59,
+        43,
+        59,
+        43,
+    )
+    assert fileposition.FilePosition.parse(
+        "C:\\path\\to\\file.py:59:43:60:48",
+    ) == fileposition.FilePosition(
+        "C:\\path\\to\\file.py",
+        59,
+        43,
+        60,
+        48,
+    )
+    assert fileposition.FilePosition.parse(
+        "C:\\path\\to\\file.py:59:43:60:48:103",
+    ) == fileposition.FilePosition(
+        "C:\\path\\to\\file.py",
+        59,
+        43,
+        60,
+        48,
+    )
+
+
+def test_fileposition_is_range() -> None:
+    assert not fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        0,
+        59,
+        0,
+    ).is_range()
+    assert not fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        59,
+        43,
+    ).is_range()
+    assert fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        60,
+        48,
+    ).is_range()
+    assert fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        59,
+        48,
+    ).is_range()
+    assert fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        60,
+        43,
+    ).is_range()
+    assert fileposition.FilePosition(
+        "src/idleopenline/utils.py",
+        59,
+        43,
+        60,
+        48,
+    ).is_range()
+
+
+def test_fileposition_parse_many() -> None:
+    strings = [
+        "src/a.py:59\n",
+        "\n",
+        "src/b.py:59:43\n",
+        "src/a.py:60:48:59:43:103\r\n",
+        "src/b.py:x:2",
+    ]
+    store = fileposition.FilePosition.parse_many(io.StringIO("".join(strings)))
+    expect = [
+        fileposition.FilePosition.parse(string.rstrip())
+        for string in strings
+        if string.strip()
+    ]
+    assert len(store) == 4
+    assert list(store) == expect
+    assert store[1] == expect[1]
+    assert store[-1] == expect[-1]
+    assert store.paths == ["src/a.py", "src/b.py"]
+    assert store.indexes_for("src/b.py") == [1, 3]
+    assert store.indexes_for("src/c.py") == []
+    assert store.nbytes() == 5 * 4 * store.line.itemsize
+
+    fileposition.FilePosition.parse_many(["src/c.py:99999999999999"], store)
+    limit = 2 ** (8 * store.line.itemsize - 1) - 1
+    assert store[4] == fileposition.FilePosition(
+        "src/c.py",
+        limit,
+        0,
+        limit,
+        0,
+    )
+    assert len(store.col) == len(store.path_ids) == 5
@@ -1,5 +1,12 @@
 """Test __init__.py."""
 
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
 import idleopenline
 
 
@@ -13,3 +20,46 @@ def check_installed_exists() -> None:
     assert callable(
         idleopenline.check_installed,
     )
+
+
+# Microseconds each import may take, as measured by -X importtime
+IMPORT_BUDGETS = (
+    ("idleopenline", 20_000),
+    # The single instance launcher, socket and pathlib included
+    ("idleopenline.instance", 50_000),
+)
+
+
+@pytest.mark.parametrize(("module", "budget"), IMPORT_BUDGETS)
+def test_import_time_budget(module: str, budget: int) -> None:
+    src = Path(idleopenline.__file__).parent.parent
+    python_path = os.pathsep.join(
+        filter(None, (str(src), os.environ.get("PYTHONPATH"))),
+    )
+    result = subprocess.run(  # noqa: S603
+        (
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            # Import typing first so it is not counted against us
+            (
+                f"import sys, typing, importlib; import {module}; "
+                "print(','.join(sorted({'idlelib', 'tkinter'} & set(sys.modules))))"
+            ),
+        ),
+        capture_output=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": python_path},
+        text=True,
+    )
+    assert result.stdout.strip() == ""
+
+    cumulative = None
+    for line in result.stderr.splitlines():
+        _self, total, name = line.split("|")
+        # Top level import, not a submodule
+        if name == f" {module}":
+            cumulative = int(total)
+    assert cumulative is not None
+    assert cumulative < budget
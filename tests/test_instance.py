@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+
+from idleopenline import fileposition, instance
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+    from pathlib import Path
+
+pytestmark = pytest.mark.skipif(
+    not instance.SUPPORTED,
+    reason="Unix domain sockets not supported",
+)
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Generator[instance.InstanceServer, None, None]:
+    server = instance.InstanceServer(tmp_path / "idleopenline.sock")
+    assert server.start()
+    yield server
+    server.close()
+
+
+def wait_positions(
+    server: instance.InstanceServer,
+    count: int,
+) -> list[fileposition.FilePosition]:
+    positions: list[fileposition.FilePosition] = []
+    deadline = time.monotonic() + 5
+    while len(positions) < count and time.monotonic() < deadline:
+        positions.extend(server.get_positions())
+        time.sleep(0.01)
+    return positions
+
+
+def test_encode_decode() -> None:
+    positions = [
+        fileposition.FilePosition("/src/a.py", 32, 4, 32, 4),
+        fileposition.FilePosition("/src/b.py", 1, 0, 3, 9),
+    ]
+    assert (
+        instance.decode_positions(
+            instance.encode_positions(positions),
+        )
+        == positions
+    )
+
+
+def test_send_positions(server: instance.InstanceServer) -> None:
+    position = fileposition.FilePosition("/src/a.py", 32, 4, 32, 4)
+    assert instance.send_positions([position], server.socket_path)
+    assert wait_positions(server, 1) == [position]
+
+
+def test_second_server_refused(server: instance.InstanceServer) -> None:
+    other = instance.InstanceServer(server.socket_path)
+    assert not other.start()
+
+
+def test_stale_socket_replaced(tmp_path: Path) -> None:
+    socket_path = tmp_path / "idleopenline.sock"
+    # Socket file left behind by an instance that did not exit cleanly
+    stale = instance.unix_socket()
+    stale.bind(str(socket_path))
+    stale.close()
+
+    assert not instance.send_positions([], socket_path)
+    server = instance.InstanceServer(socket_path)
+    try:
+        assert server.start()
+    finally:
+        server.close()
+    assert not socket_path.exists()
+
+
+def test_send_no_server(tmp_path: Path) -> None:
+    position = fileposition.FilePosition("/src/a.py", 1, 0, 1, 0)
+    assert not instance.send_positions([position], tmp_path / "none.sock")
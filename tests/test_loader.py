@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from idlelib.iomenu import IOBinding
+from typing import TYPE_CHECKING
+
+import pytest
+
+from idleopenline import fileposition, loader
+from idleopenline.textbuffer import TextBuffer
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+
+@pytest.mark.parametrize(
+    ("chars", "expected"),
+    [
+        ("", []),
+        ("a", ["a"]),
+        ("a\n", ["a\n"]),
+        ("a\nb", ["a\n", "b"]),
+        ("a\x0cb\n\n", ["a\x0cb\n", "\n"]),
+    ],
+)
+def test_split_lines(chars: str, expected: list[str]) -> None:
+    assert loader.split_lines(chars) == expected
+
+
+def test_expect(tmp_path: Path) -> None:
+    path = tmp_path / "generated.py"
+    path.write_text("x = 1\n" * 100, encoding="utf-8")
+    position = fileposition.FilePosition(str(path), 50, 0, 50, 0)
+
+    assert not loader.expect(position, 0)
+    assert not loader.expect(position, 10_000)
+    assert loader.expect(position, 100)
+    assert loader.pending[loader.get_key(str(path))] == position
+    loader.forget(str(path))
+    assert loader.get_key(str(path)) not in loader.pending
+
+
+class TopText:
+    """Text widget top of the percolator, records edits that undo sees."""
+
+    def __init__(self, buffer: TextBuffer) -> None:
+        self.buffer = buffer
+        self.edits: list[str] = []
+        self.cancelled: list[str] = []
+
+    def insert(self, index: str, chars: str) -> None:
+        """Record and insert chars."""
+        self.edits.append("insert")
+        self.buffer.insert(index, chars)
+
+    def delete(self, index1: str, index2: str | None = None) -> None:
+        """Record and delete."""
+        self.edits.append("delete")
+        self.buffer.delete(index1, index2)
+
+    def index(self, index: str) -> str:
+        """Return index, the view is always at the top."""
+        return "1.0" if index == "@0,0" else self.buffer.index(index)
+
+    def yview(self, index: str) -> None:
+        """Do nothing."""
+
+    def configure(self, **kwargs: object) -> None:
+        """Configure buffer."""
+        self.buffer.configure(**kwargs)
+
+    def after(self, delay: int, function: Callable[[], None]) -> str:
+        """Return callback id, callbacks are run by the test."""
+        return "after#1"
+
+    def after_cancel(self, after_id: str) -> None:
+        """Record cancelled callback."""
+        self.cancelled.append(after_id)
+
+
+class FakeUndo:
+    """Undo delegator with text below it."""
+
+    def __init__(self, delegate: TextBuffer) -> None:
+        self.delegate = delegate
+
+
+class FakeIO:
+    """IOBinding tracking saved state."""
+
+    def __init__(self) -> None:
+        self.saved = True
+        self.resets = 0
+
+    def reset_undo(self) -> None:
+        """Count undo resets."""
+        self.resets += 1
+
+    def set_saved(self, flag: bool) -> None:
+        """Set saved state."""
+        self.saved = flag
+
+
+class FakeEditor:
+    """Editor window with text, undo and io."""
+
+    def __init__(self) -> None:
+        self.buffer = TextBuffer()
+        self.text = TopText(self.buffer)
+        self.undo = FakeUndo(self.buffer)
+        self.io = FakeIO()
+
+
+def make_loader(
+    monkeypatch: pytest.MonkeyPatch,
+) -> tuple[FakeEditor, list[str], loader.ProgressiveLoader]:
+    monkeypatch.setattr(loader, "VIEW_LINES", 4)
+    monkeypatch.setattr(loader, "CHUNK_LINES", 3)
+    editwin = FakeEditor()
+    lines = [f"line {line}\n" for line in range(1, 21)]
+    progressive = loader.ProgressiveLoader(
+        editwin,  # type: ignore[arg-type]
+        lines,
+        10,
+    )
+    editwin.text.edits.clear()
+    progressive.start()
+    return editwin, lines, progressive
+
+
+def is_loading(editwin: FakeEditor) -> bool:
+    return any(io is editwin.io for io in loader.active)  # type: ignore[comparison-overlap]
+
+
+def test_progressive_loader_below_undo(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    editwin, lines, progressive = make_loader(monkeypatch)
+    assert editwin.buffer.get("8.0", "12.0") == "".join(lines[7:11])
+    assert loader.active[editwin.io] is progressive  # type: ignore[index]
+
+    while is_loading(editwin):
+        progressive.load_chunk()
+    assert editwin.buffer.get("1.0", "end-1c") == "".join(lines)
+    assert editwin.buffer.cget("state") == "normal"
+    # Nothing went through undo, so the window never looked modified.
+    assert editwin.text.edits == []
+    assert editwin.io.resets == 1
+
+
+def test_complete_before_save(monkeypatch: pytest.MonkeyPatch) -> None:
+    editwin, lines, progressive = make_loader(monkeypatch)
+    progressive.load_chunk()
+    saved: list[str] = []
+
+    def save(io: FakeIO, event: object) -> str:
+        saved.append(editwin.buffer.get("1.0", "end-1c"))
+        return "break"
+
+    monkeypatch.setattr(IOBinding, "save", save)
+    loader.install_complete_hook("save")
+    assert IOBinding.save(editwin.io, None) == "break"  # type: ignore[arg-type]
+    assert saved == ["".join(lines)]
+    assert not is_loading(editwin)
+    assert editwin.text.cancelled == ["after#1"]
+    assert editwin.text.edits == []
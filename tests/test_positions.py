@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Final
+
+import pytest
+
+from idleopenline import fileposition, positions, utils
+
+IS_WINDOWS: Final = sys.platform == "win32"
+
+
+def test_record_round_trip() -> None:
+    position = fileposition.FilePosition(
+        "C:\\path\\to\\file.py",
+        59,
+        43,
+        60,
+        48,
+    )
+    record = positions.serialize_record(position)
+    assert positions.parse_record(record) == position
+
+
+def test_parse_record_malformed() -> None:
+    assert positions.parse_record("") is None
+    assert positions.parse_record("file.py\t1\t2") is None
+    assert positions.parse_record("file.py\t1\t2\t3\tfish") is None
+
+
+def test_get_exact_path(tmp_path: Path) -> None:
+    store = positions.PositionStore(tmp_path / "positions.idx")
+    store.put(fileposition.FilePosition("/x/a.py.bak", 3, 0, 3, 0))
+    assert store.get("a.py") is None
+    store.put(fileposition.FilePosition("a.py", 7, 1, 7, 1))
+    assert store.get("a.py") == fileposition.FilePosition("a.py", 7, 1, 7, 1)
+
+
+def test_save_load(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.put(fileposition.FilePosition("b.py", 2, 0, 2, 0))
+    store.put(fileposition.FilePosition("a.py", 5, 0, 5, 0))
+    store.save()
+
+    loaded = positions.PositionStore(index)
+    loaded.load()
+    assert list(loaded.entries) == ["b.py", "a.py"]
+    assert loaded.get("a.py") == fileposition.FilePosition("a.py", 5, 0, 5, 0)
+
+
+def test_prune_keeps_most_recent(tmp_path: Path) -> None:
+    store = positions.PositionStore(tmp_path / "positions.idx")
+    for line in range(1, 6):
+        store.put(fileposition.FilePosition(f"{line}.py", line, 0, line, 0))
+    store.prune(2)
+    assert list(store.entries) == ["4.py", "5.py"]
+
+
+def test_remove_missing(tmp_path: Path) -> None:
+    exists = tmp_path / "exists.py"
+    exists.touch()
+    store = positions.PositionStore(tmp_path / "positions.idx")
+    store.put(fileposition.FilePosition(str(exists), 1, 0, 1, 0))
+    store.put(fileposition.FilePosition(str(tmp_path / "gone.py"), 1, 0, 1, 0))
+    assert store.remove_missing(positions.ExistenceChecker()) == [
+        str(tmp_path / "gone.py"),
+    ]
+    assert list(store.entries) == [str(exists)]
+
+
+def test_existence_checker_cache(tmp_path: Path) -> None:
+    path = tmp_path / "exists.py"
+    path.touch()
+    checker = positions.ExistenceChecker()
+    assert checker.check_many([str(path)]) == {str(path): True}
+    path.unlink()
+    assert checker.check_many([str(path)]) == {str(path): True}
+    checker.ttl = -1
+    assert checker.check_many([str(path)]) == {str(path): False}
+
+
+def test_existence_checker_timeout(tmp_path: Path) -> None:
+    # No workers, so checks never finish
+    checker = positions.ExistenceChecker(max_workers=0, timeout=0)
+    store = positions.PositionStore(tmp_path / "positions.idx")
+    store.put(fileposition.FilePosition(str(tmp_path / "gone.py"), 1, 0, 1, 0))
+    assert checker.check_many(store.entries) == {
+        str(tmp_path / "gone.py"): None,
+    }
+    assert store.remove_missing(checker) == []
+    assert len(store) == 1
+
+
+def test_existence_checker_timeout_per_path(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    release = threading.Event()
+    exists = Path.exists
+
+    def slow_exists(self: Path) -> bool:
+        if self.name == "slow.py":
+            # Unreachable network mount
+            release.wait(10)
+        else:
+            time.sleep(0.2)
+        return exists(self)
+
+    paths = [
+        str(tmp_path / name) for name in ("a.py", "slow.py", "b.py", "c.py")
+    ]
+    for path in paths:
+        Path(path).touch()
+    monkeypatch.setattr(Path, "exists", slow_exists)
+    checker = positions.ExistenceChecker(max_workers=2, timeout=0.35)
+    try:
+        results = checker.check_many(paths)
+    finally:
+        release.set()
+    # Checks after the slow one still get their own time.
+    assert results == {
+        paths[0]: True,
+        paths[1]: None,
+        paths[2]: True,
+        paths[3]: True,
+    }
+
+
+@pytest.mark.skipif(
+    IS_WINDOWS,
+    reason="Skipping Unix-specific tests on Windows",
+)
+def test_migrate_legacy(tmp_path: Path) -> None:
+    legacy = tmp_path / "last-positions.lst"
+    legacy.write_text(
+        "/src/new.py:10:4\n/src/old.py:3\nnot an entry",
+        encoding="utf-8",
+    )
+    index = tmp_path / "last-positions.idx"
+    store = positions.PositionStore(index, legacy)
+    store.load()
+    assert index.exists()
+    assert list(store.entries) == ["/src/old.py", "/src/new.py"]
+    assert store.get("/src/new.py") == fileposition.FilePosition(
+        "/src/new.py",
+        10,
+        4,
+        10,
+        4,
+    )
+
+
+def test_refresh_cache(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.save()
+
+    assert store.refresh()
+    assert not store.refresh()
+    assert not store.refresh()
+    assert store.cache_info() == positions.CacheInfo(
+        hits=2,
+        misses=1,
+        entries=1,
+    )
+
+
+def test_refresh_external_change(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.refresh()
+    assert store.get("a.py") is None
+
+    other = positions.PositionStore(index)
+    other.put(fileposition.FilePosition("a.py", 4, 2, 4, 2))
+    other.save()
+
+    assert store.refresh()
+    assert store.get("a.py") == fileposition.FilePosition("a.py", 4, 2, 4, 2)
+
+
+def test_flush_pending(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    assert not store.flush()
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    assert not index.exists()
+    assert store.flush()
+    assert not store.flush()
+    assert sorted(tmp_path.iterdir()) == [index, store.lock_path]
+
+
+def test_pending_survives_reload(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.refresh()
+    store.put(fileposition.FilePosition("a.py", 9, 0, 9, 0))
+
+    other = positions.PositionStore(index)
+    other.put(fileposition.FilePosition("b.py", 2, 0, 2, 0))
+    other.save()
+
+    assert store.refresh()
+    assert list(store.entries) == ["b.py", "a.py"]
+    store.flush()
+
+    other.load()
+    assert other.get("a.py") == fileposition.FilePosition("a.py", 9, 0, 9, 0)
+
+
+def test_save_applies_max_entries(tmp_path: Path) -> None:
+    store = positions.PositionStore(tmp_path / "positions.idx")
+    store.max_entries = 1
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.put(fileposition.FilePosition("b.py", 1, 0, 1, 0))
+    store.flush()
+    assert list(store.entries) == ["b.py"]
+
+
+def test_flush_appends_journal(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.refresh()
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.flush()
+    store.put(fileposition.FilePosition("b.py", 2, 0, 2, 0))
+    store.flush()
+    store.put(fileposition.FilePosition("a.py", 3, 0, 3, 0))
+    store.flush()
+
+    lines = index.read_text(encoding="utf-8").splitlines()
+    assert lines[0].startswith(positions.HEADER)
+    assert len(lines) == 4
+
+    other = positions.PositionStore(index)
+    other.load()
+    assert list(other.entries) == ["b.py", "a.py"]
+    assert other.get("a.py") == fileposition.FilePosition("a.py", 3, 0, 3, 0)
+
+
+def test_refresh_replays_appended(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.save()
+    store.refresh()
+    offset = store.offset
+
+    other = positions.PositionStore(index)
+    other.refresh()
+    other.put(fileposition.FilePosition("b.py", 2, 0, 2, 0))
+    other.flush()
+
+    assert store.refresh()
+    assert store.offset > offset
+    assert list(store.entries) == ["a.py", "b.py"]
+
+
+def test_torn_record_ignored(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.save()
+    with index.open("ab") as fp:
+        fp.write(b"b.py\t2\t0\t2")
+
+    other = positions.PositionStore(index)
+    other.load()
+    assert list(other.entries) == ["a.py"]
+
+    other.put(fileposition.FilePosition("c.py", 3, 0, 3, 0))
+    other.flush()
+    store.refresh()
+    assert list(store.entries) == ["a.py", "c.py"]
+
+
+def test_compaction(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.max_entries = 2
+    store.refresh()
+    paths = [str(tmp_path / f"{line}.py") for line in range(5)]
+    for line, path in enumerate(paths[1:], 1):
+        Path(path).touch()
+        store.put(fileposition.FilePosition(path, line, 0, line, 0))
+        store.flush()
+    assert len(index.read_text(encoding="utf-8").splitlines()) == 5
+
+    store.compact_size = 0
+    store.put(fileposition.FilePosition(paths[0], 9, 0, 9, 0))
+    store.put(fileposition.FilePosition(paths[4], 5, 0, 5, 0))
+    store.flush()
+    assert store.compactor is not None
+    store.compactor.join()
+
+    lines = index.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    assert store.refresh()
+    assert list(store.entries) == paths[3:]
+    assert store.get(paths[4]) == fileposition.FilePosition(
+        paths[4],
+        5,
+        0,
+        5,
+        0,
+    )
+
+
+def test_save_merges_other_writers(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.save()
+
+    other = positions.PositionStore(index)
+    other.refresh()
+    other.put(fileposition.FilePosition("b.py", 2, 0, 2, 0))
+    other.flush()
+
+    store.put(fileposition.FilePosition("c.py", 3, 0, 3, 0))
+    store.save()
+    assert list(store.entries) == ["a.py", "b.py", "c.py"]
+
+    # Rewritten as a new generation by another process
+    other.put(fileposition.FilePosition("d.py", 4, 0, 4, 0))
+    other.save()
+    store.put(fileposition.FilePosition("a.py", 5, 0, 5, 0))
+    store.save()
+
+    loaded = positions.PositionStore(index)
+    loaded.load()
+    assert list(loaded.entries) == ["b.py", "c.py", "d.py", "a.py"]
+
+
+def test_flush_keeps_cache(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.save()
+    store.refresh()
+    store.put(fileposition.FilePosition("b.py", 2, 0, 2, 0))
+    store.flush()
+    assert not store.refresh()
+
+    other = positions.PositionStore(index)
+    other.refresh()
+    other.put(fileposition.FilePosition("c.py", 3, 0, 3, 0))
+    other.flush()
+    store.put(fileposition.FilePosition("d.py", 4, 0, 4, 0))
+    store.flush()
+    assert store.refresh()
+    assert list(store.entries) == ["a.py", "b.py", "c.py", "d.py"]
+
+
+def test_lock_timeout(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.lock_timeout = 0.01
+    store.put(fileposition.FilePosition("a.py", 1, 0, 1, 0))
+    store.save()
+
+    with utils.try_lock_file(store.lock_path) as held:
+        assert held
+        # Writes still happen, compaction waits for another time.
+        store.put(fileposition.FilePosition("b.py", 2, 0, 2, 0))
+        store.flush()
+        before = index.read_bytes()
+        store.compact()
+        assert index.read_bytes() == before
+
+    store.compact()
+    assert index.read_bytes() != before
+
+
+def test_concurrent_saves(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+
+    def write(writer: int) -> None:
+        # Separate stores stand in for separate processes.
+        store = positions.PositionStore(index)
+        store.lock_timeout = 30.0
+        for line in range(10):
+            store.refresh()
+            store.put(
+                fileposition.FilePosition(f"{writer}-{line}.py", 1, 0, 1, 0),
+            )
+            if line % 2:
+                store.save()
+            else:
+                store.flush()
+
+    threads = [
+        threading.Thread(target=write, args=(writer,)) for writer in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    loaded = positions.PositionStore(index)
+    loaded.load()
+    assert len(loaded) == 60
+
+
+def test_flush_after_index_removed(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    store = positions.PositionStore(index)
+    store.refresh()
+    store.put(fileposition.FilePosition("/x/a.py", 1, 0, 1, 0))
+    store.flush()
+    index.unlink()
+
+    store.put(fileposition.FilePosition("/x/d.py", 4, 0, 4, 0))
+    store.flush()
+    assert index.read_text(encoding="utf-8").startswith(positions.HEADER)
+    loaded = positions.PositionStore(index)
+    loaded.load()
+    assert list(loaded.entries) == ["/x/a.py", "/x/d.py"]
+
+
+def test_legacy_migrated_once(tmp_path: Path) -> None:
+    index = tmp_path / "positions.idx"
+    legacy = tmp_path / "positions.lst"
+    legacy.write_text("/x/old.py:3\n", encoding="utf-8")
+    store = positions.PositionStore(index, legacy)
+    store.refresh()
+    assert list(store.entries) == ["/x/old.py"]
+
+    index.unlink()
+    assert store.refresh()
+    assert list(store.entries) == []
+    assert not index.exists()
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import io
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from idleopenline import fileposition, quickfix
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+REPORT = """\
+src/a.py:3:5: F401 [*] `os` imported but unused
+src/b.py:10: error: Name "x" is not defined  [name-defined]
+Found 2 errors.
+src/a.py:42:1:46:3: error: Type error here  [misc]
+"""
+
+
+@pytest.mark.parametrize(
+    ("line", "expected"),
+    [
+        (
+            "src/a.py:3:5: F401 `os` imported but unused",
+            quickfix.Diagnostic(
+                fileposition.FilePosition(
+                    os.path.join("base", "src", "a.py"),
+                    3,
+                    5,
+                    3,
+                    5,
+                ),
+                "F401 `os` imported but unused",
+            ),
+        ),
+        (
+            "a.py:42:1:46:3: error: Type error here",
+            quickfix.Diagnostic(
+                fileposition.FilePosition(
+                    os.path.join("base", "a.py"),
+                    42,
+                    1,
+                    46,
+                    3,
+                ),
+                "error: Type error here",
+            ),
+        ),
+        (
+            "a.py:7: note: See here\n",
+            quickfix.Diagnostic(
+                fileposition.FilePosition(
+                    os.path.join("base", "a.py"),
+                    7,
+                    0,
+                    7,
+                    0,
+                ),
+                "note: See here",
+            ),
+        ),
+        ("Found 2 errors.", None),
+        ("Success: no issues found in 12 source files", None),
+    ],
+)
+def test_parse_diagnostic(
+    line: str,
+    expected: quickfix.Diagnostic | None,
+) -> None:
+    assert quickfix.parse_diagnostic(line, "base") == expected
+
+
+def test_navigation_groups_by_file() -> None:
+    quickfix_list = quickfix.QuickfixList(io.StringIO(REPORT), "base")
+    assert quickfix_list.previous() is None
+
+    first = quickfix_list.next()
+    assert first is not None
+    assert first.position.line == 3
+
+    second = quickfix_list.next()
+    third = quickfix_list.next()
+    assert second is not None
+    assert third is not None
+    assert third.position.line == 42
+    assert quickfix_list.next() is None
+    assert quickfix_list.is_complete()
+    assert quickfix_list.previous() == second
+
+    a_path = os.path.join("base", "src", "a.py")
+    assert quickfix_list.files() == [
+        a_path,
+        os.path.join("base", "src", "b.py"),
+    ]
+    assert quickfix_list.for_file(a_path) == [first, third]
+
+
+def test_ingest_is_incremental() -> None:
+    report = "".join(
+        f"a.py:{line}:1: E501 Line too long\n" for line in range(1, 5001)
+    )
+    quickfix_list = quickfix.QuickfixList(io.StringIO(report), "")
+    assert quickfix_list.next() is not None
+    assert len(quickfix_list) == quickfix.CHUNK_LINES
+
+    while quickfix_list.ingest():
+        pass
+    assert len(quickfix_list) == 5000
+    assert quickfix_list.is_complete()
+
+
+def test_from_path_relative_to_cwd(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    report = tmp_path / "reports" / "report.txt"
+    report.parent.mkdir()
+    report.write_text("pkg/a.py:1:1: E000 message\n", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    quickfix_list = quickfix.QuickfixList.from_path(str(report))
+    diagnostic = quickfix_list.next()
+    assert diagnostic is not None
+    assert diagnostic.position.path == str(tmp_path / "pkg" / "a.py")
+    quickfix_list.close()
+    assert quickfix_list.is_complete()
+
+
+def test_from_path_base(tmp_path: Path) -> None:
+    report = tmp_path / "report.txt"
+    report.write_text("pkg/a.py:1:1: E000 message\n", encoding="utf-8")
+    base = str(tmp_path / "project")
+    quickfix_list = quickfix.QuickfixList.from_path(str(report), base)
+    diagnostic = quickfix_list.next()
+    assert diagnostic is not None
+    assert diagnostic.position.path == os.path.join(base, "pkg", "a.py")
+    assert quickfix_list.is_complete()
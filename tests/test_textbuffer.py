@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from tkinter import TclError
+
+import pytest
+
+from idleopenline import utils
+from idleopenline.textbuffer import TextBuffer, merge_ranges
+
+
+def test_merge_ranges() -> None:
+    assert merge_ranges(
+        [
+            ((3, 0), (4, 0)),
+            ((1, 0), (1, 2)),
+            ((1, 2), (2, 0)),
+            ((5, 0), (5, 0)),
+        ],
+    ) == [((1, 0), (2, 0)), ((3, 0), (4, 0))]
+
+
+@pytest.mark.parametrize(
+    ("index", "expect"),
+    [
+        ("1.0", "1.0"),
+        ("2.99", "2.3"),
+        ("2.end", "2.3"),
+        ("0.5", "1.0"),
+        ("9.0", "4.0"),
+        ("end", "4.0"),
+        ("end-1c", "3.2"),
+        ("1.0+5c", "2.0"),
+        ("2.0 - 1 chars", "1.4"),
+        ("1.2+1l", "2.2"),
+        ("3.1 lineend", "3.2"),
+        ("3.1 linestart", "3.0"),
+        ("1.0-1c", "1.0"),
+        ("end+3c", "4.0"),
+        ("2.1 wordstart", "2.0"),
+        ("2.1 wordend", "2.3"),
+        ("insert", "1.0"),
+    ],
+)
+def test_index(index: str, expect: str) -> None:
+    text = TextBuffer("abcd\nfoo\nxy")
+    assert text.index(index) == expect
+
+
+def test_index_bad() -> None:
+    text = TextBuffer("abc")
+    with pytest.raises(TclError, match="bad text index"):
+        text.index("nowhere")
+    with pytest.raises(TclError, match="bad text index"):
+        text.index("1.0+3q")
+    with pytest.raises(TclError, match="tagged with"):
+        text.index("sel.first")
+
+
+def test_get() -> None:
+    text = TextBuffer("abcd\nfoo\nxy")
+    assert text.get("1.0", "end") == "abcd\nfoo\nxy\n"
+    assert text.get("1.0", "end-1c") == "abcd\nfoo\nxy"
+    assert text.get("1.2", "2.1") == "cd\nf"
+    assert text.get("1.4") == "\n"
+    assert text.get("end") == ""
+    assert text.get("2.0", "1.0") == ""
+    assert text.compare("1.4", "<", "2.0")
+    assert not text.compare("end", "==", "end-1c")
+
+
+def test_insert() -> None:
+    text = TextBuffer("abc\ndef")
+    text.insert("1.1", "X\nY")
+    assert text.lines == ["aX", "Ybc", "def"]
+    text.insert("end", "!")
+    assert text.get("1.0", "end") == "aX\nYbc\ndef!\n"
+    text.insert("1.0", "")
+    assert text.lines == ["aX", "Ybc", "def!"]
+
+
+def test_delete() -> None:
+    text = TextBuffer("abc\ndef\nghi")
+    text.delete("1.1", "2.2")
+    assert text.lines == ["af", "ghi"]
+    text.delete("1.end")
+    assert text.lines == ["afghi"]
+    text.delete("1.0", "end")
+    assert text.get("1.0", "end") == "\n"
+    text.delete("1.0")
+    assert text.lines == [""]
+
+
+def test_disabled() -> None:
+    text = TextBuffer("abc")
+    text.configure(state="disabled")
+    text.insert("1.0", "x")
+    text.delete("1.0", "end")
+    assert text.cget("state") == "disabled"
+    assert text.lines == ["abc"]
+
+
+def test_marks() -> None:
+    text = TextBuffer("abc\ndef")
+    text.mark_set("insert", "2.1")
+    text.mark_set("left", "2.1")
+    assert text.mark_gravity("left", "left") == "left"
+    text.insert("2.1", "XY\n")
+    assert text.index("insert") == "3.0"
+    assert text.index("left") == "2.1"
+    text.delete("1.2", "3.0")
+    assert text.index("insert") == "1.2"
+    assert text.index("left") == "1.2"
+    text.mark_unset("left", "insert")
+    assert text.mark_names() == ("insert", "current")
+    with pytest.raises(TclError, match="no mark"):
+        text.mark_gravity("left")
+
+
+def test_tags() -> None:
+    text = TextBuffer("abc\ndef\nghi")
+    text.tag_add("sel", "1.1", "2.2")
+    assert text.tag_ranges("sel") == ("1.1", "2.2")
+    assert utils.get_selected_text_indexes(text) == ("1.1", "2.2")  # type: ignore[arg-type]
+    text.tag_add("hit", "1.0", None, "3.0", "3.2")
+    assert text.tag_ranges("hit") == ("1.0", "1.1", "3.0", "3.2")
+    assert text.tag_names("1.0") == ("hit",)
+    assert text.tag_nextrange("hit", "1.1") == ("3.0", "3.2")
+    assert text.tag_nextrange("hit", "1.1", "2.0") == ()
+
+    # Inside a range extends it, at either edge does not.
+    text.insert("1.2", "XX")
+    text.insert("1.1", "S")
+    assert text.tag_ranges("sel") == ("1.2", "2.2")
+    # Explicit tags replace those the text would get.
+    text.insert("1.3", "T", ("hit",))
+    assert text.tag_names("1.3") == ("hit",)
+
+    text.tag_remove("sel", "1.0", "end")
+    assert utils.get_selected_text_indexes(text) == ("1.0", "1.0")  # type: ignore[arg-type]
+    utils.hide_hit(text)  # type: ignore[arg-type]
+    assert text.tag_ranges("hit") == ()
+
+    text.tag_add("sel", "2.0", "3.1")
+    text.delete("1.end", "2.2")
+    assert text.tag_ranges("sel") == ("1.7", "2.1")
+    text.tag_delete("sel", "hit")
+    assert text.tag_names() == ("sel",)
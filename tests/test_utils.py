@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import gzip
+import json
+import os
+import subprocess
 import sys
-from typing import Final
+import threading
+import time
+from idlelib.config import idleConf
+from typing import TYPE_CHECKING, Any, ClassVar
 
 import pytest
 
 from idleopenline import utils
+from idleopenline.textbuffer import TextBuffer
 
-IS_WINDOWS: Final = sys.platform == "win32"
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
 
 
 def test_get_required_config() -> None:
@@ -88,138 +98,679 @@ def test_get_line_indent(text: str, expect: int) -> None:
     assert utils.get_line_indent(text, " ") == expect
 
 
-@pytest.mark.skipif(
-    IS_WINDOWS,
-    reason="Skipping Unix-specific tests on Windows",
+def test_reload_skips_unchanged_config(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class fish_extend(utils.BaseExtension):  # noqa: N801
+        __slots__ = ()
+        values: ClassVar = {"enable": "True", "waffle_mode": "False"}
+        waffle_mode: str = "True"
+
+    user_extensions = idleConf.userCfg["extensions"]
+    calls = {"save": 0, "user": 0, "default": 0}
+
+    def count(name: str) -> Callable[[], None]:
+        def wrapper() -> None:
+            calls[name] += 1
+
+        return wrapper
+
+    snapshot = ((1, 2), (3, 4))
+    monkeypatch.setattr(utils, "get_config_snapshot", lambda: snapshot)
+    monkeypatch.setattr(user_extensions, "Save", count("save"))
+    monkeypatch.setattr(user_extensions, "Load", count("user"))
+    monkeypatch.setattr(
+        idleConf.defaultCfg["extensions"],
+        "Load",
+        count("default"),
+    )
+    try:
+        fish_extend.reload()
+        assert calls == {"save": 1, "user": 1, "default": 1}
+        assert fish_extend.waffle_mode == "False"
+
+        fish_extend.reload()
+        assert calls == {"save": 1, "user": 1, "default": 1}
+
+        snapshot = ((1, 2), (5, 6))
+        fish_extend.reload()
+        assert calls == {"save": 1, "user": 2, "default": 2}
+    finally:
+        user_extensions.remove_section("fish_extend")
+
+
+class FakeEditor:
+    """Editor window with just what comment formatting needs."""
+
+    def get_tk_tabwidth(self) -> int:
+        """Return tab width."""
+        return 4
+
+
+def make_extension() -> utils.BaseExtension:
+    extension = utils.BaseExtension.__new__(utils.BaseExtension)
+    extension.comment_prefix = "# fish: "
+    extension.editwin = FakeEditor()  # type: ignore[assignment]
+    return extension
+
+
+def test_get_comment_insertions() -> None:
+    extension = make_extension()
+    lines = [
+        "def waffle():",
+        "    # fish: old",
+        "    return 1",
+        "\tpass",
+    ]
+    comments = [
+        utils.Comment("a.py", 1, "first"),
+        utils.Comment("a.py", 3, "old"),
+        utils.Comment("a.py", 3, "new"),
+        utils.Comment("a.py", 3, "newer"),
+        utils.Comment("a.py", 3, "new"),
+        utils.Comment("a.py", 4, "tabs"),
+    ]
+    insertions, added = extension.get_comment_insertions(
+        lines,
+        comments,
+        len(comments),
+    )
+    assert insertions == {
+        1: "# fish: first\n",
+        3: "    # fish: newer\n    # fish: new\n",
+        4: "\t# fish: tabs\n",
+    }
+    assert sorted(added) == [1, 3, 3, 4]
+
+
+def test_get_comment_insertions_max_exist_up() -> None:
+    extension = make_extension()
+    lines = ["# fish: old", "", "x = 1"]
+    comment = utils.Comment("a.py", 3, "old")
+    insertions, _added = extension.get_comment_insertions(lines, [comment])
+    assert insertions == {3: "# fish: old\n"}
+    insertions, _added = extension.get_comment_insertions(
+        lines,
+        [comment],
+        2,
+    )
+    assert insertions == {}
+
+
+def test_get_comment_index() -> None:
+    extension = make_extension()
+    lines = [
+        "# fish: a",
+        "x = 1  # fish: inline",
+        "    # fish: a",
+        "\t# fish: b",
+    ]
+    assert extension.get_comment_index(lines) == {
+        "# fish: a": [1, 3],
+        "# fish: inline": [2],
+        "# fish: b": [4],
+    }
+
+
+class CountingLines(list[str]):
+    """List of lines counting lines read by index."""
+
+    __slots__ = ("reads",)
+
+    def __init__(self, lines: list[str]) -> None:
+        """Initialize lines with no reads."""
+        super().__init__(lines)
+        self.reads = 0
+
+    def __getitem__(self, index: object) -> Any:
+        """Count read, then return item."""
+        self.reads += 1
+        return super().__getitem__(index)  # type: ignore[call-overload]
+
+
+def test_get_comment_insertions_scaling() -> None:
+    extension = make_extension()
+    size = 2000
+    lines = CountingLines([f"# fish: old {line}" for line in range(size)])
+    comments = [
+        utils.Comment("a.py", line, f"new {line}")
+        for line in range(1, size + 1)
+    ]
+    insertions, _added = extension.get_comment_insertions(
+        lines,
+        comments,
+        len(comments),
+    )
+    assert len(insertions) == size
+    # Existing comments are indexed once, not scanned per comment.
+    assert lines.reads <= len(comments)
+
+
+def test_get_comment_insertions_contained() -> None:
+    extension = make_extension()
+    lines = [
+        "# fish: error: foo [code]",
+        "x = 1  # fish: inline",
+        "y = 2",
+    ]
+    comments = [
+        utils.Comment("a.py", 3, "error: foo"),
+        utils.Comment("a.py", 3, "inline"),
+        utils.Comment("a.py", 3, "error: bar"),
+    ]
+    insertions, added = extension.get_comment_insertions(
+        lines,
+        comments,
+        2,
+    )
+    # Comments already contained in a line are not added again.
+    assert insertions == {3: "# fish: error: bar\n"}
+    assert added == [3]
+
+
+@pytest.mark.parametrize(
+    ("intervals", "expect"),
+    [
+        ([], []),
+        ([(3, 1)], []),
+        ([(5, 6), (1, 2)], [(1, 2), (5, 6)]),
+        ([(1, 2), (3, 4)], [(1, 4)]),
+        ([(1, 10), (2, 3), (9, 12)], [(1, 12)]),
+    ],
 )
-def test_fileposition_parse_unix() -> None:
-    assert utils.FilePosition.parse(
-        "src/idleopenline/utils.py:59",
-    ) == utils.FilePosition("src/idleopenline/utils.py", 59, 0, 59, 0)
-    assert utils.FilePosition.parse(
-        "src/idleopenline/utils.py:59:43",
-    ) == utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        59,
-        43,
-    )
-    assert utils.FilePosition.parse(
-        "src/idleopenline/utils.py:59:43:60",
-    ) == utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        59,
-        43,
-    )
-    assert utils.FilePosition.parse(
-        "src/idleopenline/utils.py:59:43:60:48",
-    ) == utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        60,
-        48,
-    )
-    assert utils.FilePosition.parse(
-        "src/idleopenline/utils.py:59:43:60:48:103",
-    ) == utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        60,
-        48,
-    )
-
-
-@pytest.mark.skipif(
-    not IS_WINDOWS,
-    reason="Skipping Windows-specific tests on non-Windows platforms",
+def test_merge_intervals(
+    intervals: list[tuple[int, int]],
+    expect: list[tuple[int, int]],
+) -> None:
+    assert utils.merge_intervals(intervals) == expect
+
+
+def reference_pointers(lastcol: int, comments: list[utils.Comment]) -> str:
+    columns: set[int] = set()
+    for comment in comments:
+        end = (
+            comment.column
+            if comment.column_end is None
+            else comment.column_end
+        )
+        columns.update(range(comment.column, end + 1))
+    new_line = ""
+    for col in sorted(columns):
+        spaces = (col - lastcol) - 1
+        if spaces < 0:
+            continue
+        new_line += " " * spaces + "^"
+        lastcol = col
+    return new_line
+
+
+@pytest.mark.parametrize(
+    "spans",
+    [
+        [(20, None)],
+        [(2, 30)],
+        [(12, 14), (13, 20), (40, 41), (25, None)],
+        [(30, 25), (50, 5000)],
+    ],
 )
-def test_fileposition_parse_windows() -> None:
-    assert utils.FilePosition.parse(
-        "C:\\path\\to\\file.py:59",
-    ) == utils.FilePosition("C:\\path\\to\\file.py", 59, 0, 59, 0)
-    assert utils.FilePosition.parse(
-        "C:\\path\\to\\file.py:59:43",
-    ) == utils.FilePosition(
-        "C:\\path\\to\\file.py",
-        59,
-        43,
-        59,
-        43,
-    )
-    assert utils.FilePosition.parse(
-        "C:\\path\\to\\file.py:59:43:60",
-    ) == utils.FilePosition(
-        "C:\\path\\to\\file.py",
-        59,
-        43,
-        59,
-        43,
-    )
-    assert utils.FilePosition.parse(
-        "C:\\path\\to\\file.py:59:43:60:48",
-    ) == utils.FilePosition(
-        "C:\\path\\to\\file.py",
-        59,
-        43,
-        60,
-        48,
-    )
-    assert utils.FilePosition.parse(
-        "C:\\path\\to\\file.py:59:43:60:48:103",
-    ) == utils.FilePosition(
-        "C:\\path\\to\\file.py",
-        59,
-        43,
-        60,
-        48,
-    )
-
-
-def test_fileposition_is_range() -> None:
-    assert not utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        0,
-        59,
-        0,
-    ).is_range()
-    assert not utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        59,
-        43,
-    ).is_range()
-    assert utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        60,
-        48,
-    ).is_range()
-    assert utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        59,
-        48,
-    ).is_range()
-    assert utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        60,
-        43,
-    ).is_range()
-    assert utils.FilePosition(
-        "src/idleopenline/utils.py",
-        59,
-        43,
-        60,
-        48,
-    ).is_range()
+def test_get_pointers_matches_columns(
+    spans: list[tuple[int, int | None]],
+) -> None:
+    extension = make_extension()
+    comments = [
+        utils.Comment("a.py", 4, "message", column=column, column_end=end)
+        for column, end in spans
+    ]
+    pointer = extension.get_pointers(comments, "    pass\n")
+    expect = reference_pointers(len("    # fish: "), comments)
+    if not expect.strip():
+        assert pointer is None
+    else:
+        assert pointer == utils.Comment("a.py", 5, expect)
+
+
+def test_get_pointers_batch() -> None:
+    extension = make_extension()
+    comments = [
+        utils.Comment("a.py", 1, "one", column=10),
+        utils.Comment("a.py", 2, "hidden", column=1),
+        utils.Comment("a.py", 1, "two", column=12, column_end=13),
+    ]
+    lines = ["x", "y", "z"]
+    assert extension.get_pointers_batch(comments, {"a.py": lines}) == [
+        utils.Comment("a.py", 2, " ^ ^^"),
+    ]
+
+
+class FakeFiles:
+    """IOBinding with a current file name."""
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+
+class FakeFileList:
+    """File list opening editor windows on text buffers."""
+
+    def __init__(self, files: dict[str, str]) -> None:
+        self.files = files
+        self.opened: list[str] = []
+
+    def open(self, file: str) -> FakeEditor:
+        """Return editor window for file."""
+        self.opened.append(file)
+        editwin = FakeEditor()
+        editwin.text = TextBuffer(self.files[file])  # type: ignore[attr-defined]
+        return editwin
+
+
+def test_get_pointers_batch_files(tmp_path: Path) -> None:
+    first = str(tmp_path / "a.py")
+    second = str(tmp_path / "b.py")
+    extension = make_extension()
+    extension.files = FakeFiles(first)  # type: ignore[assignment]
+    extension.editwin.text = TextBuffer("x = 1\nx")  # type: ignore[assignment]
+    flist = FakeFileList({second: "def f():\n        return 1"})
+    extension.flist = flist  # type: ignore[assignment]
+    comments = [
+        utils.Comment(first, 1, "one", column=10),
+        utils.Comment(second, 1, "hidden", column=12),
+        utils.Comment(second, 1, "two", column=18),
+    ]
+    # Indent of the next line in each comment's own file hides pointers.
+    assert extension.get_pointers_batch(comments) == [
+        utils.Comment(first, 2, " ^"),
+        utils.Comment(second, 2, " ^"),
+    ]
+    assert flist.opened == [second]
+
+
+def test_find_extension_comment_lines() -> None:
+    extension = make_extension()
+    lines = ["# fish: a", "x = 1  # fish: inline", "    # fish: b", "y"]
+    assert extension.find_extension_comment_lines(lines) == [1, 3]
+    assert extension.find_extension_comment_lines(lines, 10) == [10, 12]
+
+
+class FakeUndo:
+    """Undo delegator that counts undo blocks."""
+
+    def __init__(self) -> None:
+        """Initialize counters."""
+        self.blocks = 0
+
+    def undo_block_start(self) -> None:
+        """Start undo block."""
+        self.blocks += 1
+
+    def undo_block_stop(self) -> None:
+        """Stop undo block."""
+
+
+class FakeText:
+    """Text widget that records deletes."""
+
+    def __init__(self) -> None:
+        """Initialize deletes."""
+        self.deletes: list[tuple[str, str]] = []
+
+    def delete(self, first: str, last: str) -> None:
+        """Record delete."""
+        self.deletes.append((first, last))
+
+
+def test_remove_lines_groups_ranges() -> None:
+    extension = make_extension()
+    text = FakeText()
+    undo = FakeUndo()
+    extension.text = text  # type: ignore[assignment]
+    extension.undo = undo  # type: ignore[assignment]
+    extension.remove_lines([2, 3, 4, 7, 9, 10])
+    assert text.deletes == [("9.0", "11.0"), ("7.0", "8.0"), ("2.0", "5.0")]
+    assert undo.blocks == 1
+
+
+def test_comments_on_text_buffer() -> None:
+    extension = make_extension()
+    text = TextBuffer("def waffle():\n    return 1\n# fish: stale")
+    undo = FakeUndo()
+    extension.text = text  # type: ignore[assignment]
+    extension.undo = undo  # type: ignore[assignment]
+    editwin = extension.editwin
+    editwin.text = text  # type: ignore[assignment]
+    added = extension.add_file_comments(
+        editwin,
+        [utils.Comment("a.py", 1, "top"), utils.Comment("a.py", 2, "ret")],
+    )
+    assert sorted(added) == [1, 2]
+    assert text.get("1.0", "end-1c") == (
+        "# fish: top\ndef waffle():\n    # fish: ret\n    return 1\n"
+        "# fish: stale"
+    )
+    assert extension.remove_extension_comment_lines() == [1, 3, 5]
+    assert text.get("1.0", "end-1c") == "def waffle():\n    return 1\n"
+    assert undo.blocks == 1
+
+
+def make_comment_index(
+    chars: str,
+) -> tuple[TextBuffer, utils.CommentLineIndex]:
+    text = TextBuffer(chars)
+    comment_index = utils.CommentLineIndex(text, "# fish: ")  # type: ignore[arg-type]
+    comment_index.setdelegate(text)
+    return text, comment_index
+
+
+def test_comment_line_index_navigation() -> None:
+    _text, comment_index = make_comment_index(
+        "# fish: a\nx = 1\n    # fish: b\ny = 2\n# fish: c",
+    )
+    assert comment_index.lines == [1, 3, 5]
+    assert comment_index.next_line(1) == 3
+    assert comment_index.next_line(5) == 1
+    assert comment_index.next_line(5, wrap=False) is None
+    assert comment_index.previous_line(3) == 1
+    assert comment_index.previous_line(1) == 5
+    assert comment_index.previous_line(1, wrap=False) is None
+
+
+def test_comment_line_index_updates() -> None:
+    text, comment_index = make_comment_index(
+        "# fish: a\nx = 1\n    # fish: b\ny = 2",
+    )
+    comment_index.insert("2.0", "# fish: new\n\n")
+    assert comment_index.lines == [1, 2, 5]
+    comment_index.delete("1.0", "3.0")
+    assert comment_index.lines == [3]
+    comment_index.insert("1.0", "# fish: ")
+    assert comment_index.lines == [1, 3]
+    comment_index.delete("1.0", "1.2")
+    assert comment_index.lines == [3]
+    comment_index.delete("1.end")
+    assert comment_index.lines == [2]
+    comment_index.insert("end", "\n# fish: last")
+    comment_index.delete("1.0", "end")
+    assert text.get("1.0", "end") == "\n"
+    assert comment_index.lines == []
+
+
+def test_comment_line_index_matches_rebuild() -> None:
+    text, comment_index = make_comment_index("")
+    edits = [
+        ("insert", "1.0", "a\n# fish: 1\n\tb\n# fish: 2\n"),
+        ("insert", "3.1", "# fish: 3\n"),
+        ("delete", "2.3", "4.1"),
+        ("insert", "end", "# fish: 4"),
+        ("delete", "1.0", "1.1"),
+        ("delete", "4.0", "2.0"),
+        ("delete", "3.0", "3.0"),
+    ]
+    for action, index, argument in edits:
+        if action == "insert":
+            comment_index.insert(index, argument)
+        else:
+            comment_index.delete(index, argument)
+        _rebuilt_text, rebuilt = make_comment_index(text.get("1.0", "end-1c"))
+        assert comment_index.lines == rebuilt.lines
+
+
+def test_format_log_entry() -> None:
+    timestamp = time.mktime((2025, 1, 2, 3, 4, 5, 0, 0, -1))
+    prefix = "[2025-01-02 03:04:05] "
+    assert utils.format_log_entry(timestamp, "a\nb") == (
+        f"{prefix}a\n{prefix}b\n"
+    )
+    assert utils.format_log_entry(timestamp, "") == f"{prefix}\n"
+
+
+def test_log_writer(tmp_path: Path) -> None:
+    writer = utils.LogWriter()
+    log_file = tmp_path / "logs" / "fish.log"
+    writer.put(log_file, "first")
+    writer.put(log_file, "second\nthird\n")
+    assert writer.flush(5)
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert [line.split("] ", 1)[1] for line in lines] == [
+        "first",
+        "second",
+        "third",
+    ]
+
+
+def test_log_writer_drops_oldest(tmp_path: Path) -> None:
+    writer = utils.LogWriter(max_pending=2)
+    log_file = tmp_path / "fish.log"
+    # Writer thread cannot take entries while the lock is held.
+    with writer.condition:
+        for index in range(5):
+            writer.put(log_file, f"{index}")
+    assert writer.flush(5)
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert [line.split("] ", 1)[1] for line in lines] == [
+        "3 log entries dropped",
+        "3",
+        "4",
+    ]
+
+
+def test_log_writer_periodic(tmp_path: Path) -> None:
+    log_file = tmp_path / "fish.log"
+    calls = threading.Event()
+
+    def periodic() -> None:
+        if not calls.is_set():
+            writer.put(log_file, "summary")
+            calls.set()
+
+    writer = utils.LogWriter(periodic=periodic, interval=0.01)
+    writer.put(log_file, "first")
+    # Called with nothing else being logged.
+    assert calls.wait(5)
+    assert writer.flush(5)
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert [line.split("] ", 1)[1] for line in lines] == [
+        "first",
+        "summary",
+    ]
+
+
+def test_rotate_log(tmp_path: Path) -> None:
+    log_file = tmp_path / "fish.log"
+    rotation = utils.LogRotation(max_size=5, max_age=0, archives=2)
+    assert not utils.rotate_log(log_file, rotation)
+    for index in range(4):
+        log_file.write_text(f"entry {index}\n", encoding="utf-8")
+        assert utils.rotate_log(log_file, rotation)
+        assert not log_file.exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "fish.log.1.gz",
+        "fish.log.2.gz",
+        "fish.log.lock",
+    ]
+    with gzip.open(utils.get_log_archive(log_file, 1), "rt") as fp:
+        assert fp.read() == "entry 3\n"
+    with gzip.open(utils.get_log_archive(log_file, 2), "rt") as fp:
+        assert fp.read() == "entry 2\n"
+
+
+def test_rotate_log_age(tmp_path: Path) -> None:
+    log_file = tmp_path / "fish.log"
+    rotation = utils.LogRotation(max_size=0, max_age=60, archives=1)
+    log_file.write_text(
+        utils.format_log_entry(time.time() - 30, "recent"),
+        encoding="utf-8",
+    )
+    assert not utils.rotate_log(log_file, rotation)
+    log_file.write_text(
+        utils.format_log_entry(time.time() - 90, "old"),
+        encoding="utf-8",
+    )
+    assert utils.rotate_log(log_file, rotation)
+
+
+def test_rotate_log_locked(tmp_path: Path) -> None:
+    log_file = tmp_path / "fish.log"
+    log_file.write_text("entry\n", encoding="utf-8")
+    rotation = utils.LogRotation(max_size=1, max_age=0, archives=1)
+    lock = tmp_path / "fish.log.lock"
+    with utils.try_lock_file(lock) as locked:
+        assert locked
+        assert not utils.rotate_log(log_file, rotation)
+    assert utils.rotate_log(log_file, rotation)
+
+
+def test_lock_file_waits(tmp_path: Path) -> None:
+    lock = tmp_path / "fish.lock"
+    with utils.try_lock_file(lock) as held:
+        assert held
+        with utils.lock_file(lock, 0.02) as locked:
+            assert not locked
+    with utils.lock_file(lock, 0.02) as locked:
+        assert locked
+
+
+def test_lock_file_released_on_exit(tmp_path: Path) -> None:
+    lock = tmp_path / "fish.lock"
+    # Holder exits without releasing the lock.
+    code = (
+        "import os, sys\n"
+        "from pathlib import Path\n"
+        "from idleopenline import utils\n"
+        "with utils.try_lock_file(Path(sys.argv[1])) as locked:\n"
+        "    assert locked\n"
+        "    os._exit(0)\n"
+    )
+    subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code, str(lock)],
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    assert lock.exists()
+    with utils.try_lock_file(lock) as locked:
+        assert locked
+
+
+def raise_value_error() -> None:
+    raise ValueError("fish")
+
+
+def raise_type_error() -> None:
+    raise TypeError("fish")
+
+
+def get_exception(function: Callable[[], None]) -> BaseException:
+    try:
+        function()
+    except Exception as exc:
+        return exc
+    raise AssertionError("Expected exception")
+
+
+def test_exception_fingerprint() -> None:
+    first = utils.ExceptionFingerprint.from_exception(
+        get_exception(raise_value_error),
+    )
+    second = utils.ExceptionFingerprint.from_exception(
+        get_exception(raise_value_error),
+    )
+    assert first == second
+    assert first.type_name == "builtins.ValueError"
+    assert first.describe().endswith("in raise_value_error")
+    other = utils.ExceptionFingerprint.from_exception(
+        get_exception(raise_type_error),
+    )
+    assert other != first
+
+
+def test_exception_limiter() -> None:
+    limiter = utils.ExceptionLimiter(window=10)
+    fingerprint = utils.ExceptionFingerprint("ValueError", ())
+    assert limiter.record(fingerprint, 0) == 0
+    assert limiter.record(fingerprint, 1) is None
+    assert limiter.record(fingerprint, 2) is None
+    assert limiter.pop_summaries(5) == []
+    assert limiter.record(fingerprint, 11) == 2
+    assert limiter.record(fingerprint, 12) is None
+    assert limiter.pop_summaries(21) == ["ValueError repeated 1 times"]
+    assert limiter.pop_summaries(40) == []
+    assert limiter.record(fingerprint, 41) == 0
+    assert limiter.record(fingerprint, 42) is None
+    assert limiter.pop_summaries(42, force=True) == [
+        "ValueError repeated 1 times",
+    ]
+
+
+def test_timings(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    calls: list[int] = []
+
+    @utils.timed
+    def waffle(value: int) -> int:
+        calls.append(value)
+        return value * 2
+
+    name = f"{__name__}.{waffle.__qualname__}"
+    timings = utils.Timings()
+    monkeypatch.setattr(utils, "timings", timings)
+
+    assert waffle(1) == 2
+    assert timings.as_dict() == {}
+
+    timings.enabled = True
+    assert waffle(2) == 4
+    with timings.measure("block"):
+        pass
+    assert calls == [1, 2]
+
+    dump = tmp_path / "timings.json"
+    timings.dump(dump)
+    stats = json.loads(dump.read_text(encoding="utf-8"))
+    assert list(stats) == ["block", name]
+    assert stats[name]["calls"] == 1
+    assert sum(stats[name]["histogram"].values()) == 1
+
+    timings.reset()
+    assert timings.as_dict() == {}
+
+
+def test_timing_stats_buckets() -> None:
+    stats = utils.TimingStats()
+    for seconds in (0.00001, 0.0005, 0.0005, 0.05, 60):
+        stats.add(seconds)
+    assert stats.buckets == [1, 2, 0, 1, 0, 0, 1]
+    assert stats.maximum == 60
+    assert stats.as_dict()["calls"] == 5
+
+
+def test_profile_capture(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    monkeypatch.setattr(utils, "LOGS_PATH", tmp_path)
+    profiler = utils.ProfileCapture(threshold=0, max_files=2)
+    monkeypatch.setattr(utils, "profiler", profiler)
+
+    @utils.log_exceptions_catch
+    def waffle(value: int) -> int:
+        return value + 1
+
+    assert waffle(1) == 2
+    assert list(tmp_path.iterdir()) == []
+
+    profiler.enabled = True
+    for index in range(3):
+        assert waffle(index) == index + 1
+        # Keep modification times apart for pruning order
+        for number, path in enumerate(sorted(tmp_path.iterdir())):
+            os.utime(path, (number, number))
+    profiles = list(tmp_path.glob("profile-*.prof"))
+    assert len(profiles) == 2
+    assert all("waffle" in path.name for path in profiles)
+
+    profiler.threshold = 60
+    for path in profiles:
+        path.unlink()
+    assert waffle(1) == 2
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,349 @@
+"""Benchmark position parsing, position storage and comment engines.
+
+Runs headless, no display needed, comment edits run on a TextBuffer.
+Results are written as JSON so runs can be compared between releases:
+
+    python tools/benchmark.py --output bench.json
+    python tools/benchmark.py --quick --filter positions
+
+Each benchmark is run --repeat times. Throughput and latency are taken
+from the fastest run, the median run is reported too.
+"""
+
+# Programmed by CoolCat467
+
+from __future__ import annotations
+
+# IDLE Open Line Extension
+# Copyright (C) 2025  CoolCat467
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import idleopenline
+from idleopenline import fileposition, positions, utils
+from idleopenline.textbuffer import TextBuffer
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+# (name, size, operations per run, function to time)
+Case = tuple[str, int, int, "Callable[[], object]"]
+
+PARSE_COUNT = 1_000_000
+STORE_SIZES = (21, 1_000, 100_000)
+STORE_CYCLES = 100
+STORE_LOADS = 5
+BUFFER_SIZES = (1_000, 10_000, 200_000)
+COMMENT_PREFIX = "# benchmark: "
+
+
+class HeadlessUndo:
+    """Undo delegator stand-in, undo blocks do nothing."""
+
+    def undo_block_start(self) -> None:
+        """Start undo block."""
+
+    def undo_block_stop(self) -> None:
+        """Stop undo block."""
+
+
+class HeadlessEditor:
+    """Editor window stand-in backed by a headless text buffer."""
+
+    def __init__(self, chars: str = "") -> None:
+        """Initialize editor holding chars."""
+        self.text = TextBuffer(chars)
+        self.undo = HeadlessUndo()
+
+    def get_tk_tabwidth(self) -> int:
+        """Return tab width."""
+        return 4
+
+
+def make_extension(chars: str = "") -> utils.BaseExtension:
+    """Return extension editing a headless buffer holding chars."""
+    editwin = HeadlessEditor(chars)
+    extension = utils.BaseExtension.__new__(utils.BaseExtension)
+    extension.comment_prefix = COMMENT_PREFIX
+    extension.comment_lines = None
+    extension.editwin = editwin  # type: ignore[assignment]
+    extension.text = editwin.text  # type: ignore[assignment]
+    extension.undo = editwin.undo  # type: ignore[assignment]
+    return extension
+
+
+def make_position_strings(count: int) -> list[str]:
+    """Return count position strings, every fourth one a range."""
+    strings = []
+    for index in range(count):
+        position = f"/src/pkg/module_{index % 1000}.py:{index % 5000 + 1}"
+        if index % 2:
+            position += f":{index % 80}"
+        if index % 4 == 1:
+            position += f":{index % 5000 + 3}:{index % 40}"
+        strings.append(position)
+    return strings
+
+
+def make_buffer(size: int) -> list[str]:
+    """Return size lines of code, every tenth an extension comment."""
+    lines = []
+    for index in range(size):
+        indent = " " * (4 * (index % 3))
+        if index % 10 == 9:
+            lines.append(f"{indent}{COMMENT_PREFIX}old message {index}")
+        else:
+            lines.append(f"{indent}value_{index} = compute({index}, 'x')")
+    return lines
+
+
+def make_comments(size: int) -> list[utils.Comment]:
+    """Return comments on every fifth line of a size line buffer."""
+    return [
+        utils.Comment(
+            file="/src/pkg/module.py",
+            line=line,
+            contents=f"error: Message for line {line}  [misc]",
+            column=line % 30 + 14,
+            column_end=line % 30 + 20 + line % 3,
+        )
+        for line in range(1, size + 1, 5)
+    ]
+
+
+def parse_cases(count: int) -> Iterator[Case]:
+    """Yield FilePosition parse and serialize cases."""
+    strings = make_position_strings(count)
+    parse = fileposition.FilePosition.parse
+    parsed = [parse(string) for string in strings]
+
+    def run_parse() -> object:
+        return [parse(string) for string in strings]
+
+    def run_parse_many() -> object:
+        return fileposition.FilePosition.parse_many(strings)
+
+    def run_serialize() -> object:
+        return [position.serialize() for position in parsed]
+
+    yield ("FilePosition.parse", count, count, run_parse)
+    yield ("FilePosition.parse_many", count, count, run_parse_many)
+    yield ("FilePosition.serialize", count, count, run_serialize)
+
+
+def store_cases(folder: Path, size: int) -> Iterator[Case]:
+    """Yield last position store load and update cases."""
+    path = folder / f"positions-{size}.idx"
+    seed = positions.PositionStore(path)
+    seed.max_entries = size
+    for index in range(size):
+        seed.put(
+            fileposition.FilePosition(
+                f"/src/file_{index}.py",
+                index,
+                0,
+                index,
+                0,
+            ),
+        )
+    seed.save()
+
+    def run_load() -> object:
+        for _ in range(STORE_LOADS):
+            store = positions.PositionStore(path)
+            store.load()
+        return store
+
+    writer = positions.PositionStore(path)
+    writer.max_entries = size
+    # Compaction runs on a thread, keep it out of steady state numbers.
+    writer.compact_size = sys.maxsize
+    writer.refresh()
+    reader = positions.PositionStore(path)
+    reader.refresh()
+    cycle = [0]
+
+    def run_update() -> object:
+        for _ in range(STORE_CYCLES):
+            cycle[0] += 1
+            index = cycle[0] % size
+            filename = f"/src/file_{index}.py"
+            writer.put(
+                fileposition.FilePosition(filename, cycle[0], 0, cycle[0], 0),
+            )
+            writer.flush()
+            reader.refresh()
+            reader.get(filename)
+        return reader
+
+    yield ("positions.load", size, STORE_LOADS, run_load)
+    yield ("positions.update", size, STORE_CYCLES, run_update)
+
+
+def comment_cases(size: int) -> Iterator[Case]:
+    """Yield comment add, pointer and removal cases."""
+    extension = make_extension()
+    lines = make_buffer(size)
+    chars = "\n".join(lines)
+    comments = make_comments(size)
+
+    def run_add() -> object:
+        return extension.get_comment_insertions(
+            lines,
+            comments,
+            len(comments),
+        )
+
+    def run_pointers() -> object:
+        return extension.get_pointers_batch(
+            comments,
+            {comments[0].file: lines},
+        )
+
+    def run_remove() -> object:
+        found = extension.find_extension_comment_lines(lines)
+        return utils.merge_intervals((line, line) for line in found)
+
+    def run_edit_add() -> object:
+        editing = make_extension(chars)
+        return editing.add_file_comments(
+            editing.editwin,
+            comments,
+            len(comments),
+        )
+
+    def run_edit_remove() -> object:
+        return make_extension(chars).remove_extension_comment_lines()
+
+    yield ("comments.add", size, len(comments), run_add)
+    yield ("comments.pointers", size, len(comments), run_pointers)
+    yield ("comments.remove", size, size, run_remove)
+    yield ("text.add_comments", size, len(comments), run_edit_add)
+    yield ("text.remove_comments", size, size, run_edit_remove)
+
+
+def measure(case: Case, repeat: int) -> dict[str, object]:
+    """Run case repeat times and return its results."""
+    name, size, operations, function = case
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "name": name,
+        "size": size,
+        "operations": operations,
+        "repeat": repeat,
+        "best": best,
+        "median": statistics.median(times),
+        "throughput": operations / best if best else None,
+        "latency": best / operations,
+    }
+
+
+def run(
+    repeat: int,
+    quick: bool,
+    name_filter: str,
+) -> Iterator[dict[str, object]]:
+    """Run matching benchmarks, yielding results as they finish."""
+    scale = 100 if quick else 1
+
+    with tempfile.TemporaryDirectory() as folder:
+        groups: list[Callable[[], Iterator[Case]]] = [
+            partial(parse_cases, PARSE_COUNT // scale),
+        ]
+        groups.extend(
+            partial(store_cases, Path(folder), size)
+            for size in STORE_SIZES
+            if size <= STORE_SIZES[-1] // scale or size == STORE_SIZES[0]
+        )
+        groups.extend(
+            partial(comment_cases, size)
+            for size in BUFFER_SIZES
+            if size <= BUFFER_SIZES[-1] // scale or size == BUFFER_SIZES[0]
+        )
+        for group in groups:
+            for case in group():
+                if name_filter in case[0]:
+                    yield measure(case, repeat)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run benchmarks and write JSON report."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--output",
+        help="File to write JSON results to, standard output by default.",
+        default=None,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="Runs of each benchmark.",
+        type=int,
+        default=3,
+    )
+    parser.add_argument(
+        "--quick",
+        help="Use sizes 100 times smaller, for smoke testing.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--filter",
+        help="Only run benchmarks with names containing this.",
+        default="",
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for result in run(args.repeat, args.quick, args.filter):
+        print(
+            f"{result['name']:<24} size={result['size']:<7} "
+            f"latency={result['latency']:.3e}s",
+            file=sys.stderr,
+        )
+        results.append(result)
+
+    report = json.dumps(
+        {
+            "idleopenline": idleopenline.__version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "quick": args.quick,
+            "results": results,
+        },
+        indent=2,
+    )
+    if args.output is None:
+        print(report)
+    else:
+        Path(args.output).write_text(f"{report}\n", encoding="utf-8")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main(sys.argv[1:])